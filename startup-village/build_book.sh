@@ -1,6 +1,18 @@
 #!/bin/bash
 
 # Birdeye Data Services Workshop - Jupyter Book Build Script
+#
+# Usage:
+#   ./build_book.sh                  Re-execute every notebook against the live API
+#   ./build_book.sh --cached [MODE]  Execute notebooks in parallel from recorded API
+#                                    responses, reusing outputs of unchanged notebooks
+#                                    (MODE: replay (default), record or auto)
+
+BUILD_MODE="force"
+if [ "$1" == "--cached" ]; then
+    BUILD_MODE="cached"
+    CACHE_MODE="${2:-replay}"
+fi
 
 echo "🚀 Building Birdeye Data Services Workshop with Jupyter Book..."
 
@@ -13,8 +25,21 @@ echo "🧹 Cleaning previous builds..."
 jupyter-book clean .
 
 # Build the book
-echo "📚 Building Jupyter Book..."
-jupyter-book build .
+if [ "$BUILD_MODE" == "cached" ]; then
+    echo "📓 Executing notebooks in parallel ($CACHE_MODE)..."
+    python execute_book.py --mode "$CACHE_MODE" || exit 1
+
+    # Notebooks that failed above are executed by jupyter-book with the same responses
+    export BDS_RESPONSE_CACHE="$CACHE_MODE"
+    mkdir -p _build
+    sed 's/execute_notebooks: force/execute_notebooks: cache/' _config.yml > _build/_config.cached.yml
+
+    echo "📚 Building Jupyter Book from cached outputs..."
+    jupyter-book build . --config _build/_config.cached.yml
+else
+    echo "📚 Building Jupyter Book..."
+    jupyter-book build .
+fi
 
 # Build JupyterLite
 echo "🔬 Building JupyterLite..."
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Execute the workshop notebooks in parallel into the Jupyter Book cache
+
+Notebooks run in parallel with jupyter-cache's local-parallel executor and
+their outputs are stored in the cache Jupyter Book reads with
+`execute_notebooks: cache`. Notebooks whose code is unchanged keep their
+cached outputs. BirdeyeDataServices calls are served from recorded responses
+(see utils.ResponseCache), so a replay build needs no API key or network.
+Changing the fixtures or utils.py clears the cached outputs.
+
+Usage:
+    python execute_book.py                 # replay recorded responses (offline)
+    python execute_book.py --mode record   # call the live API and record responses
+    python execute_book.py --mode auto     # replay, recording any missing responses
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+
+import yaml
+
+from utils import ResponseCache
+
+BOOK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def toc_notebooks(toc_path):
+    """Notebook paths listed in _toc.yml"""
+    with open(toc_path) as f:
+        toc = yaml.safe_load(f)
+
+    files = [toc.get('root')]
+    pending = list(toc.get('chapters', [])) + list(toc.get('parts', []))
+    while pending:
+        entry = pending.pop(0)
+        files.append(entry.get('file'))
+        pending.extend(entry.get('sections', []) + entry.get('chapters', []))
+
+    notebooks = []
+    for name in filter(None, files):
+        path = os.path.join(BOOK_DIR, name if name.endswith('.ipynb') else f'{name}.ipynb')
+        if os.path.exists(path):
+            notebooks.append(path)
+    return notebooks
+
+
+def fixtures_hash(fixtures_dir):
+    """Hash of utils.py and the recorded responses"""
+    digest = hashlib.sha256()
+    with open(os.path.join(BOOK_DIR, 'utils.py'), 'rb') as f:
+        digest.update(f.read())
+    if os.path.isdir(fixtures_dir):
+        for name in sorted(os.listdir(fixtures_dir)):
+            if name.endswith('.json'):
+                digest.update(name.encode())
+                with open(os.path.join(fixtures_dir, name), 'rb') as f:
+                    digest.update(f.read())
+    return digest.hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=ResponseCache.MODES, default='replay',
+                        help='How API calls are served (default: replay)')
+    parser.add_argument('--fixtures', default=ResponseCache.DEFAULT_PATH,
+                        help='Directory of recorded API responses')
+    parser.add_argument('--cache', default=os.path.join(BOOK_DIR, '_build', '.jupyter_cache'),
+                        help='Jupyter cache directory used by Jupyter Book')
+    parser.add_argument('--timeout', type=int, default=120, help='Per-cell timeout in seconds')
+    parser.add_argument('--force', action='store_true', help='Re-execute every notebook')
+    args = parser.parse_args()
+
+    from jupyter_cache import get_cache
+    from jupyter_cache.executors import load_executor
+
+    fixtures_dir = os.path.abspath(args.fixtures)
+    if args.mode == 'replay' and not os.path.isdir(fixtures_dir):
+        print(f"❌ No recorded responses in {fixtures_dir}")
+        print("Run once with --mode record (requires API keys) to create them")
+        return 1
+
+    # Kernels started by the executor inherit these, so utils picks them up
+    os.environ['BDS_RESPONSE_CACHE'] = args.mode
+    os.environ['BDS_RESPONSE_CACHE_DIR'] = fixtures_dir
+
+    cache = get_cache(args.cache)
+    notebooks = toc_notebooks(os.path.join(BOOK_DIR, '_toc.yml'))
+    for path in notebooks:
+        cache.add_nb_to_project(path)
+
+    # Outputs are only valid for the fixtures they were produced with
+    hash_path = os.path.join(args.cache, 'fixtures.sha256')
+    current_hash = fixtures_hash(fixtures_dir)
+    previous_hash = open(hash_path).read().strip() if os.path.exists(hash_path) else None
+    if args.force or args.mode == 'record' or previous_hash != current_hash:
+        print("🧹 Clearing cached outputs")
+        cache.clear_cache()
+        for path in notebooks:
+            cache.add_nb_to_project(path)
+
+    stale = [record.uri for record in cache.list_unexecuted()]
+    print(f"📓 {len(notebooks) - len(stale)} of {len(notebooks)} notebooks reuse cached outputs")
+    for uri in stale:
+        print(f"   • executing {os.path.basename(uri)}")
+
+    executor = load_executor('local-parallel', cache=cache)
+    result = executor.run_and_cache(timeout=args.timeout)
+
+    # Responses recorded during execution change the hash, so store it afterwards
+    with open(hash_path, 'w') as f:
+        f.write(fixtures_hash(fixtures_dir))
+
+    failed = result.excepted + result.errored
+    print(f"✅ Executed {len(result.succeeded)} notebooks")
+    if failed:
+        print(f"⚠️ {len(failed)} notebooks failed and will be executed by jupyter-book:")
+        for uri in failed:
+            print(f"   • {os.path.basename(uri)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -27,12 +27,42 @@ def test_imports():
         from utils import create_candlestick_chart
         print("✅ create_candlestick_chart imported successfully")
         
+        from utils import create_zoomable_chart
+        print("✅ create_zoomable_chart imported successfully")
+        
         from utils import format_transaction_data
         print("✅ format_transaction_data imported successfully")
         
         from utils import check_api_key
         print("✅ check_api_key imported successfully")
         
+        from utils import WalletPnLEngine
+        print("✅ WalletPnLEngine imported successfully")
+        
+        from utils import WalletScanner
+        print("✅ WalletScanner imported successfully")
+        
+        from utils import TokenUniverse
+        print("✅ TokenUniverse imported successfully")
+        
+        from utils import IndicatorStream
+        print("✅ IndicatorStream imported successfully")
+        
+        from utils import PriceMatrix
+        print("✅ PriceMatrix imported successfully")
+        
+        from utils import PriceAlertEngine
+        print("✅ PriceAlertEngine imported successfully")
+        
+        from utils import ShardedPriceConsumer
+        print("✅ ShardedPriceConsumer imported successfully")
+        
+        from utils import ResponseCache
+        print("✅ ResponseCache imported successfully")
+        
+        from utils import AdaptiveWatcher
+        print("✅ AdaptiveWatcher imported successfully")
+        
         print("\n🎉 All imports successful!")
         return True
         
@@ -88,6 +118,250 @@ def test_utility_functions():
         print(f"❌ Utility function error: {e}")
         return False
 
+def test_wallet_pnl_engine():
+    """Test WalletPnLEngine FIFO matching against a brute-force lot queue (offline)"""
+    print("\n💰 Testing WalletPnLEngine FIFO matching...")
+    
+    try:
+        import numpy as np
+        from collections import deque
+        from utils import WalletPnLEngine
+        
+        now = 1_700_000_000
+        rng = np.random.default_rng(11)
+        trades = []
+        for token in ('AAA', 'BBB', 'CCC'):
+            for t in np.sort(rng.choice(200 * 86400, 60, replace=False)):
+                trades.append({
+                    'unix_time': now - int(t), 'address': token, 'symbol': token,
+                    'side': int(rng.choice([1, -1])), 'amount': float(rng.uniform(1, 10)),
+                    'price': float(rng.uniform(0.5, 2.0)),
+                })
+        engine = WalletPnLEngine(trades, now=now)
+        
+        for duration, window in (('all', None), ('30d', 30 * 86400)):
+            df = engine.compute(duration, 'fifo').set_index('address')
+            for token in ('AAA', 'BBB', 'CCC'):
+                lots, realized, holding = deque(), 0.0, 0.0
+                rows = sorted((r for r in trades if r['address'] == token), key=lambda r: r['unix_time'])
+                for row in rows:
+                    if row['side'] > 0:
+                        lots.append([row['amount'], row['price']])
+                        holding += row['amount']
+                        continue
+                    # Sells beyond the position held have no cost basis and are left out
+                    remaining, covered, cost = row['amount'], 0.0, 0.0
+                    while remaining > 1e-12 and lots:
+                        qty = min(remaining, lots[0][0])
+                        covered += qty
+                        cost += qty * lots[0][1]
+                        remaining -= qty
+                        lots[0][0] -= qty
+                        if lots[0][0] <= 1e-12:
+                            lots.popleft()
+                    holding -= covered
+                    if window is None or row['unix_time'] >= now - window:
+                        realized += covered * row['price'] - cost
+                if not np.isclose(df.loc[token, 'realized_profit_usd'], realized):
+                    print(f"❌ {duration} realized PnL for {token} differs from the lot queue")
+                    return False
+                if not np.isclose(df.loc[token, 'holding'], holding):
+                    print(f"❌ {duration} holding for {token} differs from the lot queue")
+                    return False
+        print("✅ FIFO realized PnL and holdings match a brute-force lot queue")
+        
+        # A position opened before the window keeps its cost basis inside it
+        engine = WalletPnLEngine([
+            {'unix_time': now - 100 * 86400, 'address': 'AAA', 'symbol': 'AAA', 'side': 1, 'amount': 10, 'price': 1.0},
+            {'unix_time': now - 3600, 'address': 'AAA', 'symbol': 'AAA', 'side': -1, 'amount': 10, 'price': 2.0},
+        ], now=now)
+        for duration in ('all', '24h'):
+            summary = engine.summary(duration)
+            if summary['pnl']['realized_profit_usd'] != 10.0 or summary['counts']['total_win'] != 1:
+                print(f"❌ {duration} window lost the cost basis of a position opened before it")
+                return False
+        print("✅ Short windows use the cost basis of earlier buys")
+        
+        # Percent fields are percentages, like the server's pnl summary
+        if summary['pnl']['realized_profit_percent'] != 100.0:
+            print("❌ realized_profit_percent is not a percentage")
+            return False
+        print("✅ realized_profit_percent is a percentage")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ WalletPnLEngine error: {e}")
+        return False
+
+def test_request_resilience():
+    """Test circuit breaker, hedging and latency sampling with a fake HTTP layer (offline)"""
+    print("\n🛡️ Testing request circuit breaker and hedging...")
+    
+    import os
+    import time
+    import requests
+    import utils
+    
+    class FakeResponse:
+        def __init__(self, status_code, payload=None):
+            self.status_code = status_code
+            self.payload = payload
+        
+        def raise_for_status(self):
+            if self.status_code >= 400:
+                raise requests.exceptions.HTTPError(f"{self.status_code} Error", response=self)
+        
+        def json(self):
+            return self.payload
+    
+    calls = []
+    replies = []
+    
+    def fake_get(url, headers=None, params=None, timeout=None):
+        calls.append(params)
+        status, delay = replies.pop(0) if replies else (200, 0)
+        time.sleep(delay)
+        return FakeResponse(status, {'success': True, 'data': {'value': len(calls)}})
+    
+    original_get = requests.get
+    original_key = os.environ.get('BDS_STANDARD_API_KEY')
+    requests.get = fake_get
+    os.environ['BDS_STANDARD_API_KEY'] = original_key or 'offline-test'
+    try:
+        client = utils.BirdeyeDataServices(failure_threshold=3, recovery_time=0.2)
+        health = client._endpoint_health('/defi/price')
+        good = client.get_token_price('AAA')
+        
+        # Consecutive 5xx responses open the breaker
+        replies.extend([(500, 0)] * 3)
+        for _ in range(3):
+            client.get_token_price('AAA')
+        if health.state != 'open':
+            print(f"❌ Breaker is {health.state} after 3 server errors")
+            return False
+        print("✅ Breaker opens after consecutive server errors")
+        
+        # While open, requests fail fast with the last good response
+        sent = len(calls)
+        if client.get_token_price('AAA') != good or len(calls) != sent:
+            print("❌ Open breaker did not serve the last good response without a request")
+            return False
+        print("✅ Open breaker serves the last good response without a request")
+        
+        # After recovery_time a single trial request closes it again
+        time.sleep(0.25)
+        if health.state != 'half-open' or client.get_token_price('AAA') is None or health.state != 'closed':
+            print("❌ Breaker did not recover through a half-open trial")
+            return False
+        print("✅ Breaker recovers through a half-open trial request")
+        
+        # Client errors are not endpoint failures and add no latency samples
+        samples = len(health.latencies)
+        replies.extend([(404, 0)] * 5)
+        for _ in range(5):
+            client.get_token_price('AAA')
+        if health.state != 'closed' or health.failures or len(health.latencies) != samples:
+            print("❌ 4xx responses counted against the endpoint")
+            return False
+        print("✅ 4xx responses do not open the breaker or add latency samples")
+        
+        # Latency samples exclude time queued in the rate limiter
+        client = utils.BirdeyeDataServices(requests_per_second=5)
+        for _ in range(6):
+            client.get_token_price('AAA')
+        p95 = client._endpoint_health('/defi/price').percentile(95)
+        if p95 > 0.05:
+            print(f"❌ p95 of instant responses is {p95:.3f}s under a rate limit")
+            return False
+        print("✅ Latency samples measure the round trip, not the rate limiter queue")
+        
+        # A request slower than p95 is hedged and the faster reply wins
+        client = utils.BirdeyeDataServices(hedge=True)
+        for _ in range(client.HEDGE_MIN_SAMPLES):
+            client.get_token_price('AAA')
+        replies.extend([(200, 0.5), (200, 0)])
+        sent = len(calls)
+        started = time.monotonic()
+        result = client.get_token_price('AAA')
+        elapsed = time.monotonic() - started
+        if len(calls) - sent != 2 or result is None or elapsed > 0.3:
+            print(f"❌ Slow request was not hedged ({len(calls) - sent} requests, {elapsed:.2f}s)")
+            return False
+        print("✅ Requests slower than p95 are hedged")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Request resilience error: {e}")
+        return False
+    finally:
+        requests.get = original_get
+        if original_key is None:
+            os.environ.pop('BDS_STANDARD_API_KEY', None)
+        else:
+            os.environ['BDS_STANDARD_API_KEY'] = original_key
+
+def test_indicator_stream():
+    """Test IndicatorStream.update against fit on the extended series (offline)"""
+    print("\n📈 Testing IndicatorStream updates...")
+    
+    try:
+        import numpy as np
+        from utils import IndicatorStream
+        
+        rng = np.random.default_rng(7)
+        close = 100 + rng.normal(0, 1, (3, 40)).cumsum(axis=-1)
+        high, low = close + 1, close - 1
+        volume = rng.uniform(1, 10, (3, 40))
+        series = (high, low, close, volume)
+        
+        def matches(result, candles):
+            expected = IndicatorStream().fit(*(a[:, candles] for a in series))
+            return all(np.allclose(result[name], expected[name][:, -1], equal_nan=True) for name in result)
+        
+        # RSI follows Wilder: seeded with the mean of the first period changes
+        from utils import rsi
+        period = 14
+        change = np.diff(close[0])
+        gains, losses = np.maximum(change, 0), np.maximum(-change, 0)
+        avg_gain, avg_loss = gains[:period].mean(), losses[:period].mean()
+        expected = np.full(close.shape[1], np.nan)
+        expected[period] = 100 - 100 / (1 + avg_gain / avg_loss)
+        for i in range(period, len(change)):
+            avg_gain = (avg_gain * (period - 1) + gains[i]) / period
+            avg_loss = (avg_loss * (period - 1) + losses[i]) / period
+            expected[i + 1] = 100 - 100 / (1 + avg_gain / avg_loss)
+        if not np.allclose(rsi(close[0], period), expected, equal_nan=True):
+            print("❌ rsi() does not match Wilder's definition")
+            return False
+        print("✅ rsi() matches Wilder's definition")
+        
+        # New candles appended one at a time
+        stream = IndicatorStream()
+        stream.fit(*(a[:, :25] for a in series))
+        for t in range(25, 40):
+            result = stream.update(*(a[:, t] for a in series))
+        if not matches(result, np.arange(40)):
+            print("❌ update() does not match fit() on the extended series")
+            return False
+        print("✅ update() matches fit() on the extended series")
+        
+        # Revising the last fitted candle replaces it instead of appending
+        stream = IndicatorStream()
+        stream.fit(*(a[:, :25] for a in series))
+        result = stream.update(*(a[:, 30] for a in series), new_candle=False)
+        if not matches(result, np.r_[0:24, 30]):
+            print("❌ update(new_candle=False) after fit() does not revise the last candle")
+            return False
+        print("✅ update(new_candle=False) after fit() revises the last candle")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ IndicatorStream error: {e}")
+        return False
+
 if __name__ == "__main__":
     print("🚀 Starting comprehensive import and functionality tests...\n")
     
@@ -95,6 +369,9 @@ if __name__ == "__main__":
     success &= test_imports()
     success &= test_api_initialization()
     success &= test_utility_functions()
+    success &= test_wallet_pnl_engine()
+    success &= test_indicator_stream()
+    success &= test_request_resilience()
     
     print("\n" + "="*50)
     if success:
@@ -3,10 +3,17 @@ Utility functions for Birdeye Data Services API Workshop
 """
 
 import os
+import sys
+import bisect
+import hashlib
+import heapq
+import queue
 import requests
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
 import json
 import websocket
@@ -17,41 +24,321 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+class RateLimiter:
+    """Thread-safe token bucket limiting requests per second"""
+
+    def __init__(self, requests_per_second=10, burst=None):
+        self.rate = float(requests_per_second)
+        self.capacity = float(burst or requests_per_second)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class ResponseCache:
+    """Recorded API responses keyed by endpoint and params
+
+    Lets notebooks run offline, e.g. for the Jupyter Book build (see
+    execute_book.py). Modes:
+        record: always call the API and save each response
+        replay: only serve saved responses, no API key needed
+        auto: serve saved responses, calling the API and saving on a miss
+
+    Time range params are left out of the key, since notebooks compute them
+    from the current time.
+    """
+
+    MODES = ('record', 'replay', 'auto')
+    VOLATILE_PARAMS = {'time_from', 'time_to', 'time', 'before_time', 'after_time'}
+    DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'responses')
+
+    def __init__(self, path=DEFAULT_PATH, mode='auto'):
+        if mode not in self.MODES:
+            raise ValueError(f"mode must be one of {self.MODES}")
+        self.path = path
+        self.mode = mode
+
+    @classmethod
+    def from_env(cls):
+        """Cache configured by BDS_RESPONSE_CACHE and BDS_RESPONSE_CACHE_DIR, if any"""
+        mode = os.getenv('BDS_RESPONSE_CACHE')
+        if not mode:
+            return None
+        return cls(os.getenv('BDS_RESPONSE_CACHE_DIR') or cls.DEFAULT_PATH, mode)
+
+    @classmethod
+    def key(cls, endpoint, params=None, method="GET", include_volatile=False):
+        """Hash of a request; time params are left out unless include_volatile"""
+        params = {k: v for k, v in (params or {}).items()
+                  if (include_volatile or k not in cls.VOLATILE_PARAMS) and v is not None}
+        payload = json.dumps({'method': method, 'endpoint': endpoint, 'params': params}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key):
+        """Saved response for key, or None"""
+        try:
+            with open(os.path.join(self.path, f'{key}.json')) as f:
+                return json.load(f)['response']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key, endpoint, params, response):
+        """Save a response; parallel writers of the same key are safe"""
+        os.makedirs(self.path, exist_ok=True)
+        target = os.path.join(self.path, f'{key}.json')
+        temp = f'{target}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp, 'w') as f:
+            json.dump({'endpoint': endpoint, 'params': params, 'response': response}, f, default=str)
+        os.replace(temp, target)
+
+
+class _EndpointHealth:
+    """Latency samples and circuit breaker state for one endpoint
+
+    The breaker opens after failure_threshold consecutive failures, fails
+    fast for recovery_time seconds, then lets a single trial request through
+    (half-open) and closes again when it succeeds.
+    """
+
+    def __init__(self, failure_threshold=5, recovery_time=30, samples=200):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.latencies = deque(maxlen=samples)
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.recovery_time:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        """Whether a request may be sent now"""
+        with self.lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self.trial_running:
+                self.trial_running = True
+                return True
+            return False
+
+    def record_success(self, latency):
+        with self.lock:
+            self.latencies.append(latency)
+        self.record_response()
+
+    def record_response(self):
+        """Close the breaker without sampling latency (e.g. on a 4xx response)"""
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.trial_running = False
+
+    def percentile(self, q):
+        with self.lock:
+            latencies = list(self.latencies)
+        return float(np.percentile(latencies, q)) if latencies else None
+
+
 class BirdeyeDataServices:
     """Custom wrapper for Birdeye Data Services API requests"""
 
-    def __init__(self, api_key_type='standard'):
+    # Hedging starts once an endpoint has this many latency samples
+    HEDGE_MIN_SAMPLES = 20
+    # Responses kept for serving while an endpoint's circuit is open
+    LAST_GOOD_SIZE = 1024
+
+    def __init__(self, api_key_type='standard', requests_per_second=None, response_cache=None,
+                 timeout=30, hedge=False, failure_threshold=5, recovery_time=30):
+        """
+        Args:
+            api_key_type: 'standard' or 'business'
+            requests_per_second: Optional client-wide rate limit
+            response_cache: Optional ResponseCache (default: from environment)
+            timeout: Seconds before a request is abandoned
+            hedge: Send a duplicate request when one takes longer than the
+                endpoint's observed p95 latency, and use the first response
+            failure_threshold: Consecutive failures that open an endpoint's circuit
+            recovery_time: Seconds an open circuit fails fast before a trial request
+        """
+        self.response_cache = response_cache or ResponseCache.from_env()
+        replaying = bool(self.response_cache and self.response_cache.mode == 'replay')
         if api_key_type == 'standard':
             self.api_key = os.getenv('BDS_STANDARD_API_KEY')
-            if not self.api_key:
+            if not self.api_key and not replaying:
                 raise ValueError("BDS_STANDARD_API_KEY not found in environment variables")
         elif api_key_type == 'business':
             self.api_key = os.getenv('BDS_API_KEY')
-            if not self.api_key:
+            if not self.api_key and not replaying:
                 raise ValueError("BDS_API_KEY not found in environment variables")
         else:
             raise ValueError("api_key_type must be 'standard' or 'business'")
 
         self.base_url = "https://public-api.birdeye.so"
         self.headers = {
-            'X-API-KEY': self.api_key,
+            'X-API-KEY': self.api_key or '',
             'Content-Type': 'application/json'
         }
+        self.rate_limiter = RateLimiter(requests_per_second) if requests_per_second else None
+        self.timeout = timeout
+        self.hedge = hedge
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self._health = {}
+        self._last_good = OrderedDict()
+        self._lock = threading.Lock()
+        self._hedge_executor = None
+
+    def _endpoint_health(self, endpoint):
+        with self._lock:
+            if endpoint not in self._health:
+                self._health[endpoint] = _EndpointHealth(self.failure_threshold, self.recovery_time)
+            return self._health[endpoint]
+
+    def _send(self, url, params, method, health):
+        """One rate-limited HTTP request; raises requests.exceptions.RequestException on failure"""
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        return self._round_trip(url, params, method, health)
+
+    def _round_trip(self, url, params, method, health):
+        """One HTTP request, recording its latency on success
+
+        Timed after the rate limiter, so the samples behind p95 measure the
+        endpoint rather than time spent queued for a token.
+        """
+        started = time.monotonic()
+        if method == "POST":
+            response = requests.post(url, headers=self.headers, json=params, timeout=self.timeout)
+        else:
+            response = requests.get(url, headers=self.headers, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        result = response.json()
+        health.record_success(time.monotonic() - started)
+        return result
+
+    def _send_hedged(self, url, params, method, health):
+        """Send a duplicate request if the first is slower than the endpoint's p95"""
+        from concurrent.futures import FIRST_COMPLETED, wait
+
+        p95 = health.percentile(95) if len(health.latencies) >= self.HEDGE_MIN_SAMPLES else None
+        if p95 is None:
+            return self._send(url, params, method, health)
+
+        with self._lock:
+            if self._hedge_executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self._hedge_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='bds-hedge')
+        # Wait for the token here so the hedge timer only covers the round trip
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        futures = {self._hedge_executor.submit(self._round_trip, url, params, method, health)}
+        done, _ = wait(futures, timeout=p95)
+        if not done:
+            futures.add(self._hedge_executor.submit(self._send, url, params, method, health))
+
+        # First successful response wins; only fail when every attempt failed
+        error = None
+        while futures:
+            done, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except requests.exceptions.RequestException as e:
+                    error = e
+        raise error
+
+    def _last_good_response(self, key):
+        with self._lock:
+            return self._last_good.get(key)
+
+    def endpoint_stats(self):
+        """Latency percentiles and circuit state per endpoint"""
+        rows = []
+        for endpoint, health in list(self._health.items()):
+            rows.append({
+                'endpoint': endpoint,
+                'state': health.state,
+                'samples': len(health.latencies),
+                'p50': health.percentile(50),
+                'p95': health.percentile(95),
+                'p99': health.percentile(99),
+                'consecutive_failures': health.failures,
+            })
+        return pd.DataFrame(rows)
 
     def _make_request(self, endpoint, params=None, method="GET"):
         """Make HTTP request to Birdeye Data Services API"""
+        cache = self.response_cache
+        if cache:
+            cache_key = ResponseCache.key(endpoint, params, method)
+            if cache.mode != 'record':
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    return cached
+                if cache.mode == 'replay':
+                    print(f"No recorded response for {endpoint} {params}")
+                    return None
+
+        health = self._endpoint_health(endpoint)
+        # Unlike the response cache, the fallback must match the exact time range
+        last_good_key = ResponseCache.key(endpoint, params, method, include_volatile=True)
+        if not health.allow():
+            print(f"Circuit open for {endpoint}, serving last good response")
+            return self._last_good_response(last_good_key)
+
         url = f"{self.base_url}{endpoint}"
         try:
-            response = None
-            if method == "POST":
-                response = requests.post(url, headers=self.headers, json=params)
+            if self.hedge:
+                result = self._send_hedged(url, params, method, health)
             else:
-                response = requests.get(url, headers=self.headers, params=params)
-            response.raise_for_status()
-            return response.json()
+                result = self._send(url, params, method, health)
         except requests.exceptions.RequestException as e:
             print(f"API request failed: {e}")
+            status = getattr(getattr(e, 'response', None), 'status_code', None)
+            # Client errors say nothing about the endpoint's health
+            if status is None or status >= 500 or status == 429:
+                health.record_failure()
+                if health.state != 'closed':
+                    return self._last_good_response(last_good_key)
+            else:
+                health.record_response()
             return None
+
+        with self._lock:
+            self._last_good[last_good_key] = result
+            self._last_good.move_to_end(last_good_key)
+            if len(self._last_good) > self.LAST_GOOD_SIZE:
+                self._last_good.popitem(last=False)
+        if cache:
+            cache.put(cache_key, endpoint, params, result)
+        return result
     
     # Token-related methods
     def get_new_listings(self, limit=50):
@@ -70,15 +357,20 @@ class BirdeyeDataServices:
         """Get token market data (available for standard API key)"""
         return self._make_request("/defi/v3/token/market-data", {"address": address})
 
-    def get_token_list(self, limit=20, min_liquidity=100000, max_liquidity=10000000, sort_by="v24hUSD", sort_type="desc"):
-        """Get token list with filtering and sorting"""
+    def get_token_list(self, limit=20, min_liquidity=100000, max_liquidity=10000000, sort_by="v24hUSD", sort_type="desc", offset=0):
+        """Get token list with filtering and sorting
+
+        Pass None for min_liquidity or max_liquidity to leave that bound out.
+        """
         params = {
             "limit": limit,
+            "offset": offset,
             "min_liquidity": min_liquidity,
             "max_liquidity": max_liquidity,
             "sort_by": sort_by,
             "sort_type": sort_type
         }
+        params = {key: value for key, value in params.items() if value is not None}
         return self._make_request("/defi/tokenlist", params)
     
     def get_price_history(self, address, address_type="token", type_="1D", time_from=None, time_to=None):
@@ -135,6 +427,28 @@ class BirdeyeDataServices:
             "POST",
         )
 
+    def get_wallet_trades(self, wallet_address, limit=100, offset=0, before_time=None, after_time=None):
+        """Get wallet swap history, newest first
+
+        Args:
+            wallet_address: Solana wallet address
+            limit: Number of trades to return (max 100)
+            offset: Pagination offset (default: 0)
+            before_time: Only return trades before this unix time
+            after_time: Only return trades after this unix time
+        """
+        params = {
+            "address": wallet_address,
+            "tx_type": "swap",
+            "limit": limit,
+            "offset": offset,
+        }
+        if before_time:
+            params["before_time"] = before_time
+        if after_time:
+            params["after_time"] = after_time
+        return self._make_request("/trader/txs/seek_by_time", params)
+
     def get_ohlcv_data(self, address, type_="1D", time_from=None, time_to=None):
         """Get OHLCV candlestick data"""
         params = {
@@ -198,6 +512,23 @@ class BirdeyeDataServicesWebSocket:
         if self.ws:
             self.ws.send(json.dumps(message))
     
+    def subscribe_prices(self, addresses, callback, chart_type="1m"):
+        """Subscribe to price updates for several addresses in one subscription"""
+        self.callbacks['PRICE_DATA'] = callback
+        query = " OR ".join(
+            f"(address = {address} AND chartType = {chart_type} AND currency = usd)"
+            for address in addresses
+        )
+        message = {
+            "type": "SUBSCRIBE_PRICE",
+            "data": {
+                "queryType": "complex",
+                "query": query
+            }
+        }
+        if self.ws:
+            self.ws.send(json.dumps(message))
+
     def subscribe_transactions(self, address, callback):
         """Subscribe to transaction updates"""
         self.callbacks['TXS_DATA'] = callback
@@ -217,8 +548,88 @@ class BirdeyeDataServicesWebSocket:
             self.ws.close()
 
 
-def create_price_chart(price_data, token_address):
-    """Create interactive price chart using Plotly"""
+# Charts are downsampled to this many points, and drawn with WebGL above the threshold
+CHART_MAX_POINTS = 2000
+WEBGL_THRESHOLD = 1000
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets downsampling
+
+    Picks threshold points that keep the visual shape of a line: the first
+    and last points plus, per bucket, the point forming the largest triangle
+    with the previously picked point and the next bucket's average.
+
+    Returns:
+        Sorted indices of the points to keep
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def downsample_ohlc(time, open_, high, low, close, volume=None, max_points=CHART_MAX_POINTS):
+    """Re-aggregate consecutive candles so at most max_points remain
+
+    Each group keeps the first open and time, the highest high, the lowest
+    low, the last close and the summed volume.
+
+    Returns:
+        Tuple (time, open, high, low, close, volume) of arrays
+    """
+    arrays = [np.asarray(a) for a in (time, open_, high, low, close)]
+    volume = np.asarray(volume, dtype=np.float64) if volume is not None else None
+    n = len(arrays[0])
+    if n <= max_points:
+        return (*arrays, volume)
+
+    size = -(-n // max_points)
+    starts = np.arange(0, n, size)
+    lasts = np.r_[starts[1:] - 1, n - 1]
+    time, open_, high, low, close = arrays
+    return (
+        time[starts],
+        open_[starts],
+        np.fmax.reduceat(high.astype(np.float64), starts),
+        np.fmin.reduceat(low.astype(np.float64), starts),
+        close[lasts],
+        np.add.reduceat(np.nan_to_num(volume), starts) if volume is not None else None,
+    )
+
+
+def _line_trace(x, y, max_points=CHART_MAX_POINTS, **kwargs):
+    """Scatter trace downsampled with LTTB, using WebGL for large series"""
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=np.float64)
+    if max_points and len(x) > max_points:
+        numeric_x = x.astype('datetime64[ns]').astype(np.int64) if np.issubdtype(x.dtype, np.datetime64) else x
+        keep = lttb(numeric_x, y, max_points)
+        x, y = x[keep], y[keep]
+    trace_type = go.Scattergl if len(x) > WEBGL_THRESHOLD else go.Scatter
+    return trace_type(x=x, y=y, **kwargs)
+
+
+def create_price_chart(price_data, token_address, max_points=CHART_MAX_POINTS):
+    """Create interactive price chart using Plotly
+
+    Series longer than max_points are downsampled with LTTB (None keeps every point).
+    """
     if not price_data or 'data' not in price_data:
         print(f"❌ No price data available for {token_address}")
         return None
@@ -231,13 +642,14 @@ def create_price_chart(price_data, token_address):
         return None
 
     # Create chart with real data
-    df = pd.DataFrame(items)
+    df = pd.DataFrame(items).sort_values('unixTime')
     df['datetime'] = pd.to_datetime(df['unixTime'], unit='s')
 
     fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=df['datetime'],
-        y=df['value'],
+    fig.add_trace(_line_trace(
+        df['datetime'],
+        df['value'],
+        max_points,
         mode='lines',
         name=f'{token_address} Price',
         line=dict(color='#00D4AA', width=2)
@@ -254,8 +666,11 @@ def create_price_chart(price_data, token_address):
     return fig
 
 
-def create_candlestick_chart(ohlcv_data, token_symbol="Token"):
-    """Create candlestick chart for OHLCV data"""
+def create_candlestick_chart(ohlcv_data, token_symbol="Token", max_points=CHART_MAX_POINTS):
+    """Create candlestick chart for OHLCV data
+
+    More than max_points candles are re-aggregated into wider candles (None keeps every candle).
+    """
     if not ohlcv_data or 'data' not in ohlcv_data:
         print("No OHLCV data available")
         return None
@@ -276,14 +691,17 @@ def create_candlestick_chart(ohlcv_data, token_symbol="Token"):
         print(f"Available fields: {list(df.columns)}")
         return None
 
-    df['datetime'] = pd.to_datetime(df['unix_time'], unit='s')
+    df = df.sort_values('unix_time')
+    time, open_, high, low, close, _ = downsample_ohlc(
+        df['unix_time'].to_numpy(), df['o'].to_numpy(), df['h'].to_numpy(),
+        df['l'].to_numpy(), df['c'].to_numpy(), max_points=max_points or len(df))
 
     fig = go.Figure(data=go.Candlestick(
-        x=df['datetime'],
-        open=df['o'],
-        high=df['h'],
-        low=df['l'],
-        close=df['c'],
+        x=pd.to_datetime(time, unit='s'),
+        open=open_,
+        high=high,
+        low=low,
+        close=close,
         name=token_symbol
     ))
 
@@ -298,8 +716,93 @@ def create_candlestick_chart(ohlcv_data, token_symbol="Token"):
     return fig
 
 
-def create_portfolio_chart(net_worth_data):
-    """Create portfolio net worth chart"""
+def _chart_interval(span, max_points, finest):
+    """Finest interval no finer than `finest` that fits span into max_points"""
+    for name, seconds in sorted(INTERVAL_SECONDS.items(), key=lambda item: item[1]):
+        if seconds >= INTERVAL_SECONDS[finest] and span / seconds <= max_points:
+            return name
+    return '1M'
+
+
+def create_zoomable_chart(client, address, kind="line", type_="1m", time_from=None, time_to=None,
+                          token_symbol=None, max_points=CHART_MAX_POINTS):
+    """Create a chart that re-fetches finer data when zoomed in
+
+    The full range is first loaded at the coarsest interval that fits
+    max_points. Zooming fetches the visible range again at the finest
+    interval that fits (down to type_), downsampled to max_points, and
+    resetting the zoom restores the overview. Returns a go.FigureWidget, so
+    zoom updates only work when displayed in Jupyter with ipywidgets.
+
+    Args:
+        client: BirdeyeDataServices instance
+        address: Token address
+        kind: 'line' for price history or 'candle' for OHLCV
+        type_: Finest interval to fetch when zoomed in
+        time_from, time_to: Unix time range of the overview (default: last 30 days)
+        token_symbol: Label for the chart title
+        max_points: Point budget for each fetch
+    """
+    if kind not in ('line', 'candle'):
+        raise ValueError("kind must be 'line' or 'candle'")
+    time_from = time_from or int((datetime.now() - timedelta(days=30)).timestamp())
+    time_to = time_to or int(datetime.now().timestamp())
+    label = token_symbol or address
+
+    def load(start, end):
+        interval = _chart_interval(end - start, max_points, type_)
+        if kind == 'line':
+            response = client.get_price_history(address, type_=interval, time_from=start, time_to=end)
+            items = response['data'].get('items') or [] if response and 'data' in response else []
+            items = sorted(items, key=lambda item: item['unixTime'])
+            x = np.array([item['unixTime'] for item in items], dtype=np.int64)
+            y = np.array([item['value'] for item in items], dtype=np.float64)
+            keep = lttb(x, y, max_points)
+            return {'x': pd.to_datetime(x[keep], unit='s'), 'y': y[keep]}
+
+        response = client.get_ohlcv_data(address, type_=interval, time_from=start, time_to=end)
+        arrays = ohlcv_arrays(response)
+        if arrays is None:
+            return {'x': [], 'open': [], 'high': [], 'low': [], 'close': []}
+        time, open_, high, low, close, _ = downsample_ohlc(
+            arrays['time'], arrays['open'], arrays['high'], arrays['low'], arrays['close'],
+            max_points=max_points)
+        return {'x': pd.to_datetime(time, unit='s'), 'open': open_, 'high': high, 'low': low, 'close': close}
+
+    overview = load(time_from, time_to)
+    if kind == 'line':
+        trace = go.Scattergl(mode='lines', name=f'{label} Price', line=dict(color='#00D4AA', width=2), **overview)
+    else:
+        trace = go.Candlestick(name=label, **overview)
+
+    fig = go.FigureWidget(data=[trace])
+    fig.update_layout(
+        title=f'{label} Price History',
+        xaxis_title='Time',
+        yaxis_title='Price (USD)',
+        xaxis_rangeslider_visible=False,
+        template='plotly_dark',
+        height=500
+    )
+
+    def on_zoom(layout, x_range):
+        if x_range is None or layout.xaxis.autorange:
+            data = overview
+        else:
+            start, end = (int(pd.Timestamp(value).timestamp()) for value in x_range)
+            data = load(max(start, time_from), min(end, time_to))
+        with fig.batch_update():
+            fig.data[0].update(**data)
+
+    fig.layout.on_change(on_zoom, 'xaxis.range')
+    return fig
+
+
+def create_portfolio_chart(net_worth_data, max_points=CHART_MAX_POINTS):
+    """Create portfolio net worth chart
+
+    Histories longer than max_points are downsampled with LTTB (None keeps every point).
+    """
     if not net_worth_data or 'data' not in net_worth_data:
         print("No portfolio data available")
         return None
@@ -338,11 +841,13 @@ def create_portfolio_chart(net_worth_data):
         return None
 
     df['datetime'] = pd.to_datetime(df[timestamp_field], utc=True)
+    df = df.sort_values('datetime')
 
     fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=df['datetime'],
-        y=df[value_field],
+    fig.add_trace(_line_trace(
+        df['datetime'].dt.tz_localize(None).to_numpy(),
+        df[value_field],
+        max_points,
         mode='lines+markers',
         name='Net Worth',
         line=dict(color='#FFD700', width=3),
@@ -542,8 +1047,1908 @@ def display_token_info(token_data):
     print("=" * 50)
 
 
+# Durations accepted by get_wallet_pnl_summary, in seconds (None = all time)
+PNL_DURATIONS = {
+    'all': None,
+    '90d': 90 * 86400,
+    '30d': 30 * 86400,
+    '7d': 7 * 86400,
+    '24h': 86400,
+}
+
+# Tokens treated as the quote side of a swap and left out of local PnL
+PNL_QUOTE_TOKENS = {
+    "So11111111111111111111111111111111111111112",  # SOL
+    "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v",  # USDC
+}
+
+
+class WalletPnLEngine:
+    """Local PnL engine over a wallet's swap history
+
+    Trades are ingested once into columnar NumPy arrays grouped by token.
+    Realized/unrealized PnL, cost basis and win rate are then computed locally
+    for every duration window, so switching durations does not cost another
+    API round trip and wallets can be analyzed offline.
+
+    Lots are matched over each token's full history, so a sell inside a
+    window uses the cost basis of buys made before it. Each window then sums
+    realized PnL, wins/losses and trade counts over the trades inside it,
+    while unrealized PnL is always on the position held now. Sells larger
+    than the position held have no known cost basis, so the uncovered part
+    is left out of realized PnL.
+    """
+
+    TRADE_COLUMNS = ['unix_time', 'address', 'symbol', 'side', 'amount', 'price']
+
+    def __init__(self, trades, current_prices=None, now=None):
+        """
+        Args:
+            trades: DataFrame or list of dicts with TRADE_COLUMNS, where side is
+                1 for a buy and -1 for a sell, and price is in USD per token
+            current_prices: Optional dict of token address -> current USD price
+                used for unrealized PnL (defaults to the last traded price)
+            now: Reference unix time for duration windows (defaults to now)
+        """
+        df = pd.DataFrame(trades)
+        if df.empty:
+            df = pd.DataFrame(columns=self.TRADE_COLUMNS)
+        df = df[self.TRADE_COLUMNS].dropna(subset=['address', 'amount', 'price'])
+        df = df[df['amount'] > 0]
+        df = df.sort_values(['address', 'unix_time'], kind='mergesort').reset_index(drop=True)
+
+        self.trades = df
+        self.now = int(now or time.time())
+        self.current_prices = dict(current_prices or {})
+
+        self._time = df['unix_time'].to_numpy(dtype=np.int64)
+        self._side = df['side'].to_numpy(dtype=np.int8)
+        self._amount = df['amount'].to_numpy(dtype=np.float64)
+        self._price = df['price'].to_numpy(dtype=np.float64)
+
+        # Trades are sorted by token, so each token is a contiguous slice
+        addresses = df['address'].to_numpy()
+        starts = np.flatnonzero(np.r_[True, addresses[1:] != addresses[:-1]]) if len(df) else np.array([], dtype=np.int64)
+        self._starts = starts
+        self._ends = np.r_[starts[1:], len(df)].astype(np.int64)
+        self._addresses = addresses[starts]
+        self._symbols = df['symbol'].to_numpy()[starts]
+        self._cache = {}
+
+    @classmethod
+    def from_transactions(cls, tx_items, quote_tokens=PNL_QUOTE_TOKENS, current_prices=None, now=None):
+        """Build an engine from get_wallet_trades items
+
+        Each swap is split into a sell of the 'from' token and a buy of the
+        'to' token. Legs in quote_tokens (SOL, USDC by default) are skipped.
+        """
+        trades = []
+        for tx in tx_items or []:
+            unix_time = tx.get('block_unix_time', 0)
+            for key in ('base', 'quote'):
+                leg = tx.get(key)
+                if not isinstance(leg, dict) or leg.get('address') in (quote_tokens or ()):
+                    continue
+                change = float(leg.get('ui_change_amount') or 0)
+                amount = abs(change) or float(leg.get('ui_amount') or 0)
+                price = leg.get('price') or leg.get('nearest_price')
+                if not amount or price is None:
+                    continue
+                if leg.get('type_swap') in ('to', 'from'):
+                    side = 1 if leg['type_swap'] == 'to' else -1
+                else:
+                    side = 1 if change > 0 else -1
+                trades.append({
+                    'unix_time': unix_time,
+                    'address': leg['address'],
+                    'symbol': leg.get('symbol', 'Unknown'),
+                    'side': side,
+                    'amount': amount,
+                    'price': float(price),
+                })
+        return cls(trades, current_prices=current_prices, now=now)
+
+    @classmethod
+    def from_client(cls, client, wallet_address, max_pages=50, page_size=100, **kwargs):
+        """Page through a wallet's swap history once and build an engine
+
+        Args:
+            client: BirdeyeDataServices instance
+            wallet_address: Solana wallet address
+            max_pages: Maximum number of pages to fetch
+            page_size: Trades per page (max 100)
+            **kwargs: Passed on to from_transactions
+        """
+        items = []
+        for page in range(max_pages):
+            response = client.get_wallet_trades(wallet_address, limit=page_size, offset=page * page_size)
+            if not response or 'data' not in response:
+                break
+            page_items = response['data'].get('items', [])
+            items.extend(page_items)
+            if len(page_items) < page_size or not response['data'].get('has_next', True):
+                break
+        return cls.from_transactions(items, **kwargs)
+
+    @staticmethod
+    def _match_fifo(side, amount, price):
+        """Matched quantity and cost per trade when sells consume the oldest lots first"""
+        buy = side > 0
+        buy_qty = np.where(buy, amount, 0.0)
+        sell_qty = np.where(buy, 0.0, amount)
+        cum_buy = np.cumsum(buy_qty)
+        cum_sell = np.cumsum(sell_qty)
+
+        # Cumulative quantity sold out of the position, clipped to what was held
+        covered = cum_sell + np.minimum(np.minimum.accumulate(cum_buy - cum_sell), 0.0)
+
+        # Cost of the first x units bought is piecewise linear in x
+        lot_qty = np.r_[0.0, cum_buy[buy]]
+        lot_cost = np.r_[0.0, np.cumsum(amount[buy] * price[buy])]
+        covered_cost = np.interp(covered, lot_qty, lot_cost)
+
+        matched_qty = np.diff(covered, prepend=0.0)
+        matched_cost = np.diff(covered_cost, prepend=0.0)
+        holding = cum_buy[-1] - covered[-1]
+        remaining_cost = lot_cost[-1] - covered_cost[-1]
+        return matched_qty, matched_cost, holding, remaining_cost
+
+    @staticmethod
+    def _match_average(side, amount, price):
+        """Matched quantity and cost per trade at the running average cost"""
+        matched_qty = np.zeros(len(side))
+        matched_cost = np.zeros(len(side))
+        holding = cost = 0.0
+        for i in range(len(side)):
+            if side[i] > 0:
+                holding += amount[i]
+                cost += amount[i] * price[i]
+            elif holding > 0:
+                qty = min(amount[i], holding)
+                sold_cost = cost * qty / holding
+                matched_qty[i] = qty
+                matched_cost[i] = sold_cost
+                holding -= qty
+                cost -= sold_cost
+        return matched_qty, matched_cost, holding, cost
+
+    def _token_matches(self, method):
+        """Lot matching over each token's full history, computed once per method
+
+        Returns:
+            List per token of (realized per trade, matched cost per trade,
+            closed sell mask, holding, remaining cost)
+        """
+        key = ('matches', method)
+        if key not in self._cache:
+            match = self._match_fifo if method == 'fifo' else self._match_average
+            matches = []
+            for start, end in zip(self._starts, self._ends):
+                side = self._side[start:end]
+                price = self._price[start:end]
+                matched_qty, matched_cost, holding, remaining_cost = match(side, self._amount[start:end], price)
+                realized = np.where(side < 0, matched_qty * price - matched_cost, 0.0)
+                # Sells with no covered quantity are neither wins nor losses
+                closed = (side < 0) & (matched_qty > 0)
+                matches.append((realized, matched_cost, closed, holding, remaining_cost))
+            self._cache[key] = matches
+        return self._cache[key]
+
+    def _token_pnl(self, token, first, match):
+        """PnL of one token over its trades from index first onwards
+
+        Lots are matched over the full history, so sells inside the window
+        use the cost basis of positions opened before it.
+        """
+        start, end = self._starts[token], self._ends[token]
+        realized_all, matched_cost_all, closed_all, holding, remaining_cost = match
+        window = slice(first - start, end - start)
+        side = self._side[first:end]
+        notional = self._amount[first:end] * self._price[first:end]
+        realized = realized_all[window]
+        closed = closed_all[window]
+
+        sell = side < 0
+        wins = int(np.count_nonzero(closed & (realized > 0)))
+        losses = int(np.count_nonzero(closed & (realized < 0)))
+
+        # Unrealized PnL is on the position held now, whatever the window
+        address = self._addresses[token]
+        current_price = self.current_prices.get(address, self._price[end - 1])
+        current_value = holding * current_price
+        realized_usd = float(realized.sum())
+        unrealized_usd = current_value - remaining_cost
+        closed_cost = float(matched_cost_all[window].sum())
+
+        return {
+            'address': address,
+            'symbol': self._symbols[token],
+            'total_buy': int(np.count_nonzero(~sell)),
+            'total_sell': int(np.count_nonzero(sell)),
+            'total_trade': len(side),
+            'total_win': wins,
+            'total_loss': losses,
+            'win_rate': wins / (wins + losses) if wins + losses else 0.0,
+            'total_invested': float(notional[~sell].sum()),
+            'total_sold': float(notional[sell].sum()),
+            'holding': holding,
+            'cost_basis': remaining_cost / holding if holding > 0 else 0.0,
+            'current_price': current_price,
+            'current_value': current_value,
+            'realized_cost_usd': closed_cost,
+            'realized_profit_usd': realized_usd,
+            'realized_profit_percent': 100.0 * realized_usd / closed_cost if closed_cost else 0.0,
+            'unrealized_usd': unrealized_usd,
+            'total_usd': realized_usd + unrealized_usd,
+        }
+
+    def compute(self, duration='all', method='fifo'):
+        """Per-token PnL for one duration window
+
+        Args:
+            duration: 'all', '90d', '30d', '7d' or '24h'
+            method: Cost basis method, 'fifo' or 'average'
+
+        Returns:
+            DataFrame with one row per token traded in the window
+        """
+        if duration not in PNL_DURATIONS:
+            raise ValueError(f"duration must be one of {list(PNL_DURATIONS)}")
+        if method not in ('fifo', 'average'):
+            raise ValueError("method must be 'fifo' or 'average'")
+
+        key = (duration, method)
+        if key not in self._cache:
+            matches = self._token_matches(method)
+            window = PNL_DURATIONS[duration]
+            rows = []
+            for token, (start, end) in enumerate(zip(self._starts, self._ends)):
+                first = start
+                if window is not None:
+                    first = start + np.searchsorted(self._time[start:end], self.now - window)
+                if first < end:
+                    rows.append(self._token_pnl(token, first, matches[token]))
+            df = pd.DataFrame(rows)
+            if not df.empty:
+                df = df.sort_values('total_usd', ascending=False).reset_index(drop=True)
+            self._cache[key] = df
+        return self._cache[key]
+
+    def compute_all(self, method='fifo'):
+        """Per-token PnL for every duration window, keyed by duration
+
+        Lots are matched once per token and shared by all windows.
+        """
+        return {duration: self.compute(duration, method) for duration in PNL_DURATIONS}
+
+    def summary(self, duration='all', method='fifo'):
+        """Wallet PnL summary in the same shape as get_wallet_pnl_summary's data['summary']"""
+        df = self.compute(duration, method)
+
+        def total(column):
+            return float(df[column].sum()) if not df.empty else 0.0
+
+        wins, losses = int(total('total_win')), int(total('total_loss'))
+        total_trade = int(total('total_trade'))
+        realized = total('realized_profit_usd')
+        unrealized = total('unrealized_usd')
+        realized_cost = total('realized_cost_usd')
+        return {
+            'unique_tokens': len(df),
+            'counts': {
+                'total_buy': int(total('total_buy')),
+                'total_sell': int(total('total_sell')),
+                'total_trade': total_trade,
+                'total_win': wins,
+                'total_loss': losses,
+                'win_rate': wins / (wins + losses) if wins + losses else 0.0,
+            },
+            'cashflow_usd': {
+                'total_invested': total('total_invested'),
+                'total_sold': total('total_sold'),
+                'current_value': total('current_value'),
+            },
+            'pnl': {
+                'realized_profit_usd': realized,
+                'realized_profit_percent': 100.0 * realized / realized_cost if realized_cost else 0.0,
+                'unrealized_usd': unrealized,
+                'total_usd': realized + unrealized,
+                'avg_profit_per_trade_usd': (realized + unrealized) / total_trade if total_trade else 0.0,
+            },
+        }
+
+    def reconcile(self, server_summary, duration='all', method='fifo'):
+        """Compare the local summary against get_wallet_pnl_summary
+
+        Args:
+            server_summary: Response from get_wallet_pnl_summary, or its data['summary']
+            duration: Duration the server summary was fetched for
+            method: Cost basis method for the local summary
+
+        Returns:
+            DataFrame with local, server and difference per metric
+        """
+        if server_summary and 'data' in server_summary:
+            server_summary = server_summary['data'].get('summary', {})
+        server_summary = server_summary or {}
+        local = self.summary(duration, method)
+
+        rows = [{'metric': 'unique_tokens', 'local': local['unique_tokens'],
+                 'server': server_summary.get('unique_tokens')}]
+        for section in ('counts', 'cashflow_usd', 'pnl'):
+            server_section = server_summary.get(section, {})
+            for metric, value in local[section].items():
+                rows.append({'metric': f'{section}.{metric}', 'local': value,
+                             'server': server_section.get(metric)})
+
+        df = pd.DataFrame(rows)
+        df['local'] = pd.to_numeric(df['local'], errors='coerce')
+        df['server'] = pd.to_numeric(df['server'], errors='coerce')
+        df['diff'] = df['local'] - df['server']
+        return df
+
+
+class WalletScanner:
+    """Scan many wallets concurrently across wallet endpoints
+
+    Endpoint calls run on a thread pool under a shared rate limiter and each
+    wallet's results are streamed out as soon as all its endpoints complete.
+    With a checkpoint file, completed wallets are appended as JSON lines so a
+    killed run resumes where it stopped. Failed wallets are reported, not
+    raised, and are retried on the next run.
+    """
+
+    # Scanner endpoint name -> BirdeyeDataServices method
+    ENDPOINTS = {
+        'net_worth': 'get_wallet_net_worth',
+        'net_worth_details': 'get_wallet_net_worth_details',
+        'pnl_summary': 'get_wallet_pnl_summary',
+    }
+
+    def __init__(self, client, endpoints=('net_worth', 'pnl_summary'), max_workers=8,
+                 requests_per_second=10, checkpoint_path=None):
+        """
+        Args:
+            client: BirdeyeDataServices instance
+            endpoints: Endpoint names from ENDPOINTS, or a dict of endpoint
+                name -> extra keyword arguments (e.g. {'pnl_summary': {'duration': '30d'}})
+            max_workers: Number of concurrent requests
+            requests_per_second: Request rate when the client has no rate limiter
+            checkpoint_path: Optional JSON lines file used to resume scans
+        """
+        if not isinstance(endpoints, dict):
+            endpoints = {name: {} for name in endpoints}
+        unknown = set(endpoints) - set(self.ENDPOINTS)
+        if unknown:
+            raise ValueError(f"Unknown endpoints {sorted(unknown)}, expected {list(self.ENDPOINTS)}")
+
+        self.client = client
+        self.endpoints = endpoints
+        self.max_workers = max_workers
+        self.checkpoint_path = checkpoint_path
+        # Reuse the client's limiter so requests made elsewhere share the budget
+        self.rate_limiter = None if getattr(client, 'rate_limiter', None) else RateLimiter(requests_per_second)
+        self.results = []
+        self.failures = {}
+
+    def _load_checkpoint(self):
+        """Rows of wallets completed successfully in a previous run"""
+        rows = {}
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Partial line from a killed run
+                    if not row.get('error'):
+                        rows[row['wallet']] = row
+        return rows
+
+    def _fetch(self, wallet, endpoint):
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        method = getattr(self.client, self.ENDPOINTS[endpoint])
+        response = method(wallet, **self.endpoints[endpoint])
+        if not response or not response.get('success', True) or 'data' not in response:
+            raise RuntimeError(f"{endpoint} request failed")
+        return response['data']
+
+    def _row(self, wallet, results, errors):
+        row = {'wallet': wallet}
+        for endpoint, data in results.items():
+            if isinstance(data, dict):
+                flat = pd.json_normalize(data, sep='.').iloc[0].to_dict() if data else {}
+                row.update({f'{endpoint}.{key}': value for key, value in flat.items()})
+            else:
+                row[endpoint] = data
+        row['error'] = '; '.join(f'{endpoint}: {error}' for endpoint, error in errors.items()) or None
+        return row
+
+    def iter_scan(self, wallets):
+        """Scan wallets, yielding one result row per wallet as it completes
+
+        Wallets already completed in the checkpoint are yielded first without
+        any request. Results and failures from previous scans are cleared.
+        """
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        self.results = []
+        self.failures = {}
+        done = self._load_checkpoint()
+        pending = {}
+        for wallet in dict.fromkeys(wallets):
+            if wallet in done:
+                self.results.append(done[wallet])
+                yield done[wallet]
+            else:
+                pending[wallet] = ({}, {})
+
+        checkpoint = open(self.checkpoint_path, 'a') if self.checkpoint_path else None
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            futures = {
+                executor.submit(self._fetch, wallet, endpoint): (wallet, endpoint)
+                for wallet in pending
+                for endpoint in self.endpoints
+            }
+            remaining = {wallet: len(self.endpoints) for wallet in pending}
+            for future in as_completed(futures):
+                wallet, endpoint = futures[future]
+                results, errors = pending[wallet]
+                try:
+                    results[endpoint] = future.result()
+                except Exception as e:
+                    errors[endpoint] = str(e)
+
+                remaining[wallet] -= 1
+                if remaining[wallet]:
+                    continue
+
+                row = self._row(wallet, results, errors)
+                del pending[wallet]
+                if errors:
+                    self.failures[wallet] = errors
+                self.results.append(row)
+                if checkpoint:
+                    checkpoint.write(json.dumps(row, default=str) + '\n')
+                    checkpoint.flush()
+                yield row
+        finally:
+            # Closing the generator early drops queued requests instead of waiting for them
+            executor.shutdown(wait=False, cancel_futures=True)
+            if checkpoint:
+                checkpoint.close()
+
+    def scan(self, wallets, on_result=None, progress_every=100):
+        """Scan wallets and return the combined results
+
+        Args:
+            wallets: Iterable of wallet addresses
+            on_result: Optional callback called with each wallet's result row
+            progress_every: Print progress every N wallets (0 to disable)
+
+        Returns:
+            DataFrame with one row per wallet; failed wallets have an 'error'
+        """
+        wallets = list(wallets)
+        for count, row in enumerate(self.iter_scan(wallets), 1):
+            if on_result:
+                on_result(row)
+            if progress_every and count % progress_every == 0:
+                print(f"Scanned {count}/{len(wallets)} wallets ({len(self.failures)} failed)")
+        if self.failures:
+            print(f"⚠️ {len(self.failures)} wallets failed, rerun to retry them")
+        return self.to_dataframe()
+
+    def to_dataframe(self):
+        """Combined DataFrame of the results of the last scan"""
+        return pd.DataFrame(self.results)
+
+
+class TokenUniverse:
+    """In-memory snapshot of the token list for local screening
+
+    The full token list is paged through once into columnar NumPy arrays.
+    Filters, top-K and range queries then run locally instead of costing a
+    new paginated get_token_list round trip per screener tweak. Sorted
+    indexes per metric are built lazily and reused until the next refresh.
+    """
+
+    TEXT_COLUMNS = ('address', 'symbol', 'name')
+
+    def __init__(self, client, min_liquidity=None, max_liquidity=None, sort_by="liquidity", page_size=50):
+        """Fetch the full token list into a new snapshot
+
+        Args:
+            client: BirdeyeDataServices instance
+            min_liquidity: Optional server-side liquidity floor for the snapshot
+            max_liquidity: Optional server-side liquidity cap for the snapshot
+            sort_by: Server sort order used while paging; incremental refreshes
+                re-fetch the first pages of this order
+            page_size: Tokens per get_token_list page (max 50)
+        """
+        self.client = client
+        self.min_liquidity = min_liquidity
+        self.max_liquidity = max_liquidity
+        self.sort_by = sort_by
+        self.page_size = page_size
+        self.lock = threading.Lock()
+        self.updated_at = None
+        self._rows = {}
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread = None
+        self._stop_refresh = threading.Event()
+        self._build([])
+        self.refresh()
+
+    def _fetch_pages(self, max_pages=None):
+        rows = []
+        page = 0
+        while max_pages is None or page < max_pages:
+            response = self.client.get_token_list(
+                limit=self.page_size,
+                offset=page * self.page_size,
+                min_liquidity=self.min_liquidity,
+                max_liquidity=self.max_liquidity,
+                sort_by=self.sort_by,
+                sort_type="desc",
+            )
+            if not response or 'data' not in response:
+                break
+            tokens = response['data'].get('tokens', [])
+            rows.extend(token for token in tokens if token.get('address'))
+            page += 1
+            total = response['data'].get('total')
+            if len(tokens) < self.page_size or (total is not None and page * self.page_size >= total):
+                break
+        return rows
+
+    def _build(self, rows):
+        """Rebuild the columnar arrays from a list of token rows"""
+        numeric = sorted({
+            key for row in rows for key, value in row.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        })
+        columns = {}
+        for key in self.TEXT_COLUMNS:
+            columns[key] = np.array([row.get(key) for row in rows], dtype=object)
+        for key in numeric:
+            values = [row.get(key) for row in rows]
+            columns[key] = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+        # Swap in the new snapshot in one step so readers never see a mix
+        with self.lock:
+            self.columns = columns
+            self.size = len(rows)
+            self._sorted = {}
+
+    def refresh(self, max_pages=None):
+        """Fetch token list pages and merge them into the snapshot
+
+        Args:
+            max_pages: Only re-fetch the first N pages for an incremental
+                refresh (None fetches the full list)
+
+        Returns:
+            Number of tokens fetched
+        """
+        rows = self._fetch_pages(max_pages)
+        # Refreshes are serialized so an older fetch never replaces a newer snapshot
+        with self._refresh_lock:
+            with self.lock:
+                if max_pages is None:
+                    self._rows = {row['address']: row for row in rows}
+                else:
+                    for row in rows:
+                        self._rows[row['address']] = {**self._rows.get(row['address'], {}), **row}
+                snapshot = list(self._rows.values())
+            self._build(snapshot)
+            self.updated_at = datetime.now()
+        return len(rows)
+
+    def start_auto_refresh(self, interval=60, max_pages=4):
+        """Incrementally refresh the first max_pages pages every interval seconds"""
+        self.stop_auto_refresh()
+        self._stop_refresh.clear()
+
+        def run():
+            while not self._stop_refresh.wait(interval):
+                try:
+                    self.refresh(max_pages=max_pages)
+                except Exception as e:
+                    print(f"Token universe refresh failed: {e}")
+
+        self._refresh_thread = threading.Thread(target=run, daemon=True)
+        self._refresh_thread.start()
+
+    def stop_auto_refresh(self):
+        """Stop the background refresh thread"""
+        if self._refresh_thread:
+            self._stop_refresh.set()
+            self._refresh_thread.join()
+            self._refresh_thread = None
+
+    @staticmethod
+    def _column(columns, metric):
+        if metric not in columns:
+            raise KeyError(f"Unknown column '{metric}', available: {list(columns)}")
+        return columns[metric]
+
+    @staticmethod
+    def _frame(columns, index):
+        return pd.DataFrame({name: values[index] for name, values in columns.items()})
+
+    def _sorted_index(self, metric):
+        """Columns plus cached (order, sorted values) for a numeric column, NaNs last"""
+        with self.lock:
+            if metric not in self._sorted:
+                values = self._column(self.columns, metric)
+                order = np.argsort(values, kind='stable')
+                self._sorted[metric] = (order, values[order])
+            return self.columns, self._sorted[metric]
+
+    def _mask(self, columns, ranges):
+        selected = np.ones(len(columns['address']), dtype=bool)
+        for metric, (low, high) in ranges.items():
+            values = self._column(columns, metric)
+            if low is not None:
+                selected &= values >= low
+            if high is not None:
+                selected &= values <= high
+        return selected
+
+    def mask(self, **ranges):
+        """Boolean mask of tokens matching every (low, high) range
+
+        Example: universe.mask(liquidity=(1e5, None), v24hUSD=(1e6, 5e7))
+        """
+        return self._mask(self.columns, ranges)
+
+    def filter(self, **ranges):
+        """Tokens matching every (low, high) range as a DataFrame"""
+        columns = self.columns
+        return self._frame(columns, np.flatnonzero(self._mask(columns, ranges)))
+
+    def top_k(self, metric, k=20, ascending=False, mask=None):
+        """Top k tokens by a metric without sorting the whole universe
+
+        Args:
+            metric: Numeric column to rank by
+            k: Number of tokens to return
+            ascending: Return the lowest values instead of the highest
+            mask: Optional boolean mask from mask() to rank within
+
+        Returns:
+            DataFrame of the k tokens in rank order
+        """
+        columns = self.columns
+        values = self._column(columns, metric)
+        valid = ~np.isnan(values)
+        if mask is not None:
+            valid &= mask
+        k = min(k, int(np.count_nonzero(valid)))
+        if k <= 0:
+            return self._frame(columns, np.array([], dtype=np.int64))
+
+        # Rank by key ascending, with NaNs and masked-out tokens pushed last
+        key = np.where(valid, values if ascending else -values, np.inf)
+        candidates = np.argpartition(key, k - 1)[:k] if k < len(key) else np.arange(len(key))
+        return self._frame(columns, candidates[np.argsort(key[candidates], kind='stable')])
+
+    def range_index(self, metric, low=None, high=None):
+        """Row indices with low <= metric <= high, in ascending metric order
+
+        Two binary searches on the cached sorted index, so the cost is
+        O(log n) plus the size of the result.
+        """
+        return self._range_index(metric, low, high)[1]
+
+    def _range_index(self, metric, low, high):
+        columns, (order, values) = self._sorted_index(metric)
+        start = 0 if low is None else np.searchsorted(values, low, side='left')
+        # NaNs sort last, so an open upper bound stops at the last real value
+        end = np.searchsorted(values, np.inf if high is None else high, side='right')
+        return columns, order[start:end]
+
+    def range(self, metric, low=None, high=None):
+        """Tokens with low <= metric <= high as a DataFrame"""
+        return self._frame(*self._range_index(metric, low, high))
+
+    def to_dataframe(self, index=None):
+        """Snapshot (or the rows at index) as a DataFrame"""
+        return self._frame(self.columns, slice(None) if index is None else index)
+
+
+def ohlcv_arrays(ohlcv_data):
+    """Convert a get_ohlcv_data response into NumPy arrays
+
+    Returns:
+        Dict with 'time', 'open', 'high', 'low', 'close' and 'volume' arrays
+        ordered by time, or None when there is no data
+    """
+    if not ohlcv_data or 'data' not in ohlcv_data:
+        print("No OHLCV data available")
+        return None
+
+    items = ohlcv_data['data'].get('items', [])
+    if not items:
+        print("No OHLCV items available")
+        return None
+
+    items = sorted(items, key=lambda item: item.get('unix_time', 0))
+    fields = {'time': 'unix_time', 'open': 'o', 'high': 'h', 'low': 'l', 'close': 'c', 'volume': 'v'}
+    arrays = {name: np.array([item.get(field, np.nan) for item in items], dtype=np.float64)
+              for name, field in fields.items()}
+    arrays['time'] = arrays['time'].astype(np.int64)
+    return arrays
+
+
+def ema(values, span=None, alpha=None):
+    """Exponential moving average along the last axis
+
+    Seeded with the first value (pandas ewm(adjust=False)). Works on a 1-D
+    series or a 2-D (tokens, time) array. The recurrence is solved in closed
+    form over blocks short enough that the decay powers stay in float range.
+    """
+    x = np.asarray(values, dtype=np.float64)
+    alpha = alpha if alpha is not None else 2.0 / (span + 1)
+    if alpha >= 1 or x.shape[-1] == 0:
+        return x.copy()
+
+    decay = 1.0 - alpha
+    block = max(1, int(150 / -np.log10(decay)))
+    out = np.empty_like(x)
+    prev = x[..., 0]
+    for start in range(0, x.shape[-1], block):
+        chunk = x[..., start:start + block]
+        k = np.arange(chunk.shape[-1])
+        powers = decay ** k
+        # y_t = decay^(t+1) * prev + alpha * decay^t * sum_{j<=t} x_j / decay^j
+        out[..., start:start + block] = (
+            decay ** (k + 1) * prev[..., None]
+            + alpha * powers * np.cumsum(chunk / powers, axis=-1)
+        )
+        prev = out[..., start + chunk.shape[-1] - 1]
+    return out
+
+
+def _rsi_from_averages(avg_gain, avg_loss):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    rsi = np.where(avg_loss == 0, 100.0, rsi)
+    return np.where((avg_gain == 0) & (avg_loss == 0), 50.0, rsi)
+
+
+def _wilder_averages(change, period):
+    """Wilder average gain and loss per price change, NaN until period changes exist
+
+    Both averages start from the simple mean of the first period changes
+    and are then smoothed with alpha = 1 / period, as in TA-Lib.
+    """
+    avg_gain = np.full(change.shape, np.nan)
+    avg_loss = np.full(change.shape, np.nan)
+    if change.shape[-1] >= period:
+        for values, out in ((np.maximum(change, 0.0), avg_gain), (np.maximum(-change, 0.0), avg_loss)):
+            seeded = np.concatenate([values[..., :period].mean(axis=-1, keepdims=True), values[..., period:]], axis=-1)
+            out[..., period - 1:] = ema(seeded, alpha=1.0 / period)
+    return avg_gain, avg_loss
+
+
+def rsi(close, period=14):
+    """Relative strength index with Wilder smoothing, NaN for the first period candles"""
+    close = np.asarray(close, dtype=np.float64)
+    avg_gain, avg_loss = _wilder_averages(np.diff(close, axis=-1), period)
+    pad = np.full(close.shape[:-1] + (1,), np.nan)
+    return np.concatenate([pad, _rsi_from_averages(avg_gain, avg_loss)], axis=-1)
+
+
+def vwap(high, low, close, volume, window=None):
+    """Volume weighted average of the typical price (h + l + c) / 3
+
+    Cumulative from the first candle, or rolling over the last window candles.
+    """
+    typical = (np.asarray(high, dtype=np.float64) + low + close) / 3.0
+    volume = np.asarray(volume, dtype=np.float64)
+    cum_pv = np.cumsum(typical * volume, axis=-1)
+    cum_v = np.cumsum(volume, axis=-1)
+    if window:
+        cum_pv[..., window:] = cum_pv[..., window:] - cum_pv[..., :-window]
+        cum_v[..., window:] = cum_v[..., window:] - cum_v[..., :-window]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(cum_v > 0, cum_pv / cum_v, np.nan)
+
+
+def bollinger_bands(close, window=20, num_std=2.0):
+    """Bollinger bands (middle, upper, lower), NaN until window candles exist"""
+    close = np.asarray(close, dtype=np.float64)
+    middle = np.full(close.shape, np.nan)
+    std = np.full(close.shape, np.nan)
+    if close.shape[-1] >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(close, window, axis=-1)
+        middle[..., window - 1:] = windows.mean(axis=-1)
+        std[..., window - 1:] = windows.std(axis=-1)
+    return middle, middle + num_std * std, middle - num_std * std
+
+
+class IndicatorStream:
+    """Technical indicators over OHLCV with O(1) updates per new candle
+
+    fit() computes the full history in one vectorized pass and keeps just the
+    state needed to continue: EMA values, RSI average gain/loss, VWAP running
+    sums and a ring buffer of the last Bollinger window closes. update() then
+    advances every indicator by one candle for all tokens at once.
+
+    Inputs are 1-D for a single token or 2-D (tokens, time) for many tokens
+    on the same candle grid.
+    """
+
+    def __init__(self, ema_spans=(12, 26), rsi_period=14, bollinger_window=20, bollinger_std=2.0):
+        self.ema_spans = tuple(ema_spans)
+        self.rsi_period = rsi_period
+        self.bollinger_window = bollinger_window
+        self.bollinger_std = bollinger_std
+        self.state = None
+        self._previous = None
+
+    def fit(self, high, low, close, volume):
+        """Compute indicators over the full history and seed the stream state
+
+        Returns:
+            Dict of indicator arrays shaped like close
+        """
+        high, low, close, volume = (np.asarray(a, dtype=np.float64) for a in (high, low, close, volume))
+        self._single = close.ndim == 1
+        high, low, close, volume = (np.atleast_2d(a) for a in (high, low, close, volume))
+
+        result = {f'ema_{span}': ema(close, span) for span in self.ema_spans}
+        change = np.diff(close, axis=-1)
+        avg_gain, avg_loss = _wilder_averages(change, self.rsi_period)
+        pad = np.full((close.shape[0], 1), np.nan)
+        result['rsi'] = np.concatenate([pad, _rsi_from_averages(avg_gain, avg_loss)], axis=-1)
+        result['vwap'] = vwap(high, low, close, volume)
+        result['bb_middle'], result['bb_upper'], result['bb_lower'] = bollinger_bands(
+            close, self.bollinger_window, self.bollinger_std)
+
+        typical = (high + low + close) / 3.0
+        emas = {span: result[f'ema_{span}'] for span in self.ema_spans}
+        candles = close.shape[-1]
+        self.state = self._seed_state(close, typical, volume, emas, change, avg_gain, avg_loss, candles)
+        # State before the last candle, so update(new_candle=False) can revise it
+        self._previous = None
+        if candles > 1:
+            self._previous = self._seed_state(close, typical, volume, emas, change, avg_gain, avg_loss, candles - 1)
+        return {name: values[0] if self._single else values for name, values in result.items()}
+
+    def _seed_state(self, close, typical, volume, emas, change, avg_gain, avg_loss, end):
+        """Stream state after the first end candles of a fitted history"""
+        window = self.bollinger_window
+        buffer = np.full((close.shape[0], window), np.nan)
+        tail = close[:, max(0, end - window):end]
+        count = tail.shape[1]
+        buffer[:, :count] = tail
+        return {
+            'ema': {span: values[:, end - 1].copy() for span, values in emas.items()},
+            'last_close': close[:, end - 1].copy(),
+            'avg_gain': avg_gain[:, end - 2].copy() if end > 1 else np.full(close.shape[0], np.nan),
+            'avg_loss': avg_loss[:, end - 2].copy() if end > 1 else np.full(close.shape[0], np.nan),
+            # Price changes seen, with their sums for the RSI warm-up mean
+            'changes': end - 1,
+            'gain_sum': np.maximum(change[:, :min(end - 1, self.rsi_period)], 0.0).sum(axis=-1),
+            'loss_sum': np.maximum(-change[:, :min(end - 1, self.rsi_period)], 0.0).sum(axis=-1),
+            'cum_pv': (typical[:, :end] * volume[:, :end]).sum(axis=-1),
+            'cum_v': volume[:, :end].sum(axis=-1),
+            'buffer': buffer,
+            'position': count % window,
+            'count': count,
+            'sum': tail.sum(axis=-1),
+            'sum_sq': (tail ** 2).sum(axis=-1),
+        }
+
+    @staticmethod
+    def _copy_state(state):
+        copy = {key: value.copy() if isinstance(value, np.ndarray) else value for key, value in state.items()}
+        copy['ema'] = {span: value.copy() for span, value in state['ema'].items()}
+        return copy
+
+    def update(self, high, low, close, volume, new_candle=True):
+        """Advance all indicators by one candle
+
+        Args:
+            high, low, close, volume: Latest candle values, scalars for a
+                single token or 1-D arrays with one value per token
+            new_candle: False when the candle revises the last one (e.g. the
+                WebSocket re-sending the still-open candle); the previous
+                update is rolled back before applying it
+
+        Returns:
+            Dict of the latest indicator values
+        """
+        if self.state is None:
+            raise ValueError("Call fit() with at least one candle before update()")
+        if not new_candle and self._previous is None:
+            # Revising the only candle fitted so far: seed again from it
+            candle = (np.asarray(a, dtype=np.float64)[..., None] for a in (high, low, close, volume))
+            result = self.fit(*candle)
+            return {name: values[..., -1] for name, values in result.items()}
+        if not new_candle:
+            self.state = self._previous
+        self._previous = self._copy_state(self.state)
+
+        high, low, close, volume = (np.atleast_1d(np.asarray(a, dtype=np.float64)) for a in (high, low, close, volume))
+        state = self.state
+        result = {}
+
+        for span in self.ema_spans:
+            alpha = 2.0 / (span + 1)
+            state['ema'][span] = alpha * close + (1 - alpha) * state['ema'][span]
+            result[f'ema_{span}'] = state['ema'][span]
+
+        change = close - state['last_close']
+        gain, loss = np.maximum(change, 0.0), np.maximum(-change, 0.0)
+        state['changes'] += 1
+        if state['changes'] <= self.rsi_period:
+            state['gain_sum'] = state['gain_sum'] + gain
+            state['loss_sum'] = state['loss_sum'] + loss
+            if state['changes'] == self.rsi_period:
+                state['avg_gain'] = state['gain_sum'] / self.rsi_period
+                state['avg_loss'] = state['loss_sum'] / self.rsi_period
+        else:
+            alpha = 1.0 / self.rsi_period
+            state['avg_gain'] = alpha * gain + (1 - alpha) * state['avg_gain']
+            state['avg_loss'] = alpha * loss + (1 - alpha) * state['avg_loss']
+        state['last_close'] = close
+        result['rsi'] = _rsi_from_averages(state['avg_gain'], state['avg_loss'])
+
+        state['cum_pv'] = state['cum_pv'] + (high + low + close) / 3.0 * volume
+        state['cum_v'] = state['cum_v'] + volume
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result['vwap'] = np.where(state['cum_v'] > 0, state['cum_pv'] / state['cum_v'], np.nan)
+
+        # Swap the oldest close in the ring buffer for the new one
+        window = self.bollinger_window
+        position = state['position']
+        if state['count'] >= window:
+            oldest = state['buffer'][:, position]
+            state['sum'] = state['sum'] - oldest
+            state['sum_sq'] = state['sum_sq'] - oldest ** 2
+        state['buffer'][:, position] = close
+        state['sum'] = state['sum'] + close
+        state['sum_sq'] = state['sum_sq'] + close ** 2
+        state['position'] = (position + 1) % window
+        state['count'] = min(state['count'] + 1, window)
+        if state['count'] >= window:
+            middle = state['sum'] / window
+            std = np.sqrt(np.maximum(state['sum_sq'] / window - middle ** 2, 0.0))
+        else:
+            middle = std = np.full(close.shape, np.nan)
+        result['bb_middle'] = middle
+        result['bb_upper'] = middle + self.bollinger_std * std
+        result['bb_lower'] = middle - self.bollinger_std * std
+
+        return {name: values[0] if self._single else values for name, values in result.items()}
+
+
+# Candle/price interval types accepted by the API, in seconds
+INTERVAL_SECONDS = {
+    '1m': 60, '3m': 180, '5m': 300, '15m': 900, '30m': 1800,
+    '1H': 3600, '2H': 7200, '4H': 14400, '6H': 21600, '8H': 28800, '12H': 43200,
+    '1D': 86400, '3D': 259200, '1W': 604800, '1M': 2592000,
+}
+
+
+class PriceMatrix:
+    """Time-aligned price matrix for many tokens
+
+    values is an (N tokens, T times) array on a regular time grid. Each grid
+    point holds the last price at or before it; observed marks grid points
+    with a fresh observation since the previous one, so gaps filled forward
+    can be told apart from real prices. Returns, correlation and covariance
+    are computed over the whole matrix at once, ignoring gaps pairwise.
+    """
+
+    def __init__(self, addresses, times, values, observed, failed=None):
+        self.addresses = list(addresses)
+        self.times = np.asarray(times, dtype=np.int64)
+        self.values = np.asarray(values, dtype=np.float64)
+        self.observed = np.asarray(observed, dtype=bool)
+        self.failed = list(failed or [])
+
+    @classmethod
+    def from_series(cls, series, step, time_from=None, time_to=None, ffill=True, failed=None):
+        """Align irregular series onto a regular grid
+
+        Args:
+            series: Dict of address -> (unix times, prices)
+            step: Grid spacing in seconds or an INTERVAL_SECONDS key
+            time_from, time_to: Grid bounds (default: the span of the data)
+            ffill: Carry the last price forward over gaps (NaN otherwise)
+        """
+        step = INTERVAL_SECONDS[step] if isinstance(step, str) else int(step)
+        series = {address: (np.asarray(t, dtype=np.int64), np.asarray(v, dtype=np.float64))
+                  for address, (t, v) in series.items()}
+        starts = [t[0] for t, _ in series.values() if len(t)]
+        ends = [t[-1] for t, _ in series.values() if len(t)]
+        if time_from is None:
+            time_from = min(starts) if starts else 0
+        if time_to is None:
+            time_to = max(ends) if ends else time_from
+        times = np.arange(time_from - time_from % step, time_to + 1, step, dtype=np.int64)
+
+        values = np.full((len(series), len(times)), np.nan)
+        observed = np.zeros((len(series), len(times)), dtype=bool)
+        for row, (t, v) in enumerate(series.values()):
+            if not len(t):
+                continue
+            order = np.argsort(t, kind='stable')
+            t, v = t[order], v[order]
+            # As-of join: index of the last observation at or before each grid time
+            last = np.searchsorted(t, times, side='right') - 1
+            has_value = last >= 0
+            values[row, has_value] = v[last[has_value]]
+            observed[row] = has_value & (np.diff(last, prepend=-1) > 0)
+        if not ffill:
+            values[~observed] = np.nan
+        return cls(series.keys(), times, values, observed, failed)
+
+    @classmethod
+    def fetch(cls, client, addresses, type_="1H", time_from=None, time_to=None, resample=None,
+              ffill=True, max_workers=8, requests_per_second=10):
+        """Fetch price history for many tokens concurrently and align it
+
+        Args:
+            client: BirdeyeDataServices instance
+            addresses: Token addresses
+            type_: Price history interval passed to get_price_history
+            time_from, time_to: Unix time range (default: last 30 days)
+            resample: Grid spacing (seconds or interval key, default type_)
+            ffill: Carry the last price forward over gaps
+            max_workers: Number of concurrent requests
+            requests_per_second: Request rate when the client has no rate limiter
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        time_from = time_from or int((datetime.now() - timedelta(days=30)).timestamp())
+        time_to = time_to or int(datetime.now().timestamp())
+        rate_limiter = None if getattr(client, 'rate_limiter', None) else RateLimiter(requests_per_second)
+
+        def fetch_one(address):
+            if rate_limiter:
+                rate_limiter.acquire()
+            response = client.get_price_history(address, type_=type_, time_from=time_from, time_to=time_to)
+            items = (response or {}).get('data', {}).get('items') if response else None
+            if not items:
+                return None
+            return ([item['unixTime'] for item in items], [item['value'] for item in items])
+
+        addresses = list(dict.fromkeys(addresses))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(fetch_one, addresses))
+
+        series = {address: result or ([], []) for address, result in zip(addresses, results)}
+        failed = [address for address, result in zip(addresses, results) if result is None]
+        if failed:
+            print(f"⚠️ No price history for {len(failed)} of {len(addresses)} tokens")
+        return cls.from_series(series, resample or type_, time_from, time_to, ffill, failed)
+
+    def returns(self, log=False, mask_gaps=True):
+        """(N, T - 1) returns between consecutive grid points
+
+        With mask_gaps, returns ending on a forward-filled point are NaN
+        instead of a spurious zero.
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if log:
+                result = np.diff(np.log(self.values), axis=-1)
+            else:
+                result = self.values[:, 1:] / self.values[:, :-1] - 1.0
+        if mask_gaps:
+            result[~self.observed[:, 1:]] = np.nan
+        return result
+
+    @staticmethod
+    def _pairwise_moments(x):
+        """Pairwise-complete counts, means and co-moments of the rows of x"""
+        mask = ~np.isnan(x)
+        m = mask.astype(np.float64)
+        xm = np.where(mask, x, 0.0)
+        count = m @ m.T
+        sum_i = xm @ m.T  # sum of x_i where x_j is also present
+        sum_ij = xm @ xm.T
+        sum_sq_i = (xm ** 2) @ m.T
+        return count, sum_i, sum_ij, sum_sq_i
+
+    @classmethod
+    def _covariance(cls, x, min_periods):
+        count, sum_i, sum_ij, _ = cls._pairwise_moments(x)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = (sum_ij - sum_i * sum_i.T / count) / (count - 1)
+        cov[count < max(min_periods, 2)] = np.nan
+        return cov
+
+    @classmethod
+    def _correlation(cls, x, min_periods):
+        count, sum_i, sum_ij, sum_sq_i = cls._pairwise_moments(x)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = sum_ij - sum_i * sum_i.T / count
+            var_i = sum_sq_i - sum_i ** 2 / count
+            corr = cov / np.sqrt(var_i * var_i.T)
+        corr[count < max(min_periods, 2)] = np.nan
+        return np.clip(corr, -1.0, 1.0)
+
+    def covariance(self, log=False, min_periods=2):
+        """(N, N) covariance of returns over pairwise-complete periods"""
+        return self._covariance(self.returns(log), min_periods)
+
+    def correlation(self, log=False, min_periods=2):
+        """(N, N) correlation of returns over pairwise-complete periods"""
+        return self._correlation(self.returns(log), min_periods)
+
+    def rolling_correlation(self, window, step=1, log=False, min_periods=None):
+        """Correlation matrices over a sliding window of returns
+
+        Returns:
+            (times, array of shape (K, N, N)) where times are the grid times
+            at the end of each window
+        """
+        returns = self.returns(log)
+        min_periods = min_periods or window // 2
+        ends = np.arange(window, returns.shape[1] + 1, step)
+        matrices = np.array([self._correlation(returns[:, end - window:end], min_periods) for end in ends])
+        return self.times[ends], matrices.reshape(len(ends), len(self.addresses), len(self.addresses))
+
+    def rolling_correlation_with(self, address, window, log=False):
+        """(N, T - 1) rolling correlation of every token against one token"""
+        returns = self.returns(log)
+        reference = returns[self.addresses.index(address)]
+        both = ~np.isnan(returns) & ~np.isnan(reference)
+        x = np.where(both, returns, 0.0)
+        y = np.where(both, reference, 0.0)
+
+        def rolling_sum(a):
+            total = np.cumsum(a, axis=-1)
+            total[..., window:] = total[..., window:] - total[..., :-window]
+            return total
+
+        n = rolling_sum(both.astype(np.float64))
+        sx, sy = rolling_sum(x), rolling_sum(y)
+        sxy, sxx, syy = rolling_sum(x * y), rolling_sum(x * x), rolling_sum(y * y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = sxy - sx * sy / n
+            corr = cov / np.sqrt((sxx - sx ** 2 / n) * (syy - sy ** 2 / n))
+        corr[:, :window - 1] = np.nan
+        corr[n < 2] = np.nan
+        return np.clip(corr, -1.0, 1.0)
+
+    def to_dataframe(self):
+        """Prices as a DataFrame with a datetime index and one column per token"""
+        index = pd.to_datetime(self.times, unit='s')
+        return pd.DataFrame(self.values.T, index=index, columns=self.addresses)
+
+
+class _AlertBook:
+    """Rules for one (address, metric), sorted by threshold per direction"""
+
+    def __init__(self):
+        self.rules = []
+        self.above = []
+        self.above_rules = []
+        self.below = []
+        self.below_rules = []
+        self.inactive = 0
+        self.dirty = False
+
+    def rebuild(self):
+        self.rules = [rule for rule in self.rules if rule['active']]
+        above = sorted((rule for rule in self.rules if rule['direction'] == 'above'), key=lambda rule: rule['threshold'])
+        below = sorted((rule for rule in self.rules if rule['direction'] == 'below'), key=lambda rule: rule['threshold'])
+        # Swap whole lists so a tick on another thread sees the old or new book, never a mix
+        self.above_rules, self.above = above, [rule['threshold'] for rule in above]
+        self.below_rules, self.below = below, [rule['threshold'] for rule in below]
+        self.inactive = 0
+        self.dirty = False
+
+
+class PriceAlertEngine:
+    """Price and volume alerts evaluated on the WebSocket tick stream
+
+    Rules are indexed per address and metric in threshold-sorted lists, so a
+    tick only needs two binary searches to find the rules crossed since the
+    previous tick for that address, instead of checking every rule. A rule
+    fires when the value crosses its threshold in its direction: 'above'
+    when previous < threshold <= value, 'below' when value <= threshold <
+    previous. The first tick for an address only sets the baseline.
+    """
+
+    # Alert metric -> field in PRICE_DATA messages
+    METRICS = {'price': 'c', 'volume': 'v'}
+
+    def __init__(self, on_alert=None):
+        """
+        Args:
+            on_alert: Default callback for rules without their own, called
+                with the alert dict
+        """
+        self.on_alert = on_alert
+        self.lock = threading.Lock()
+        self._books = {}
+        self._rules = {}
+        self._last = {}
+        self._next_id = 0
+
+    def add_rule(self, address, threshold, direction='above', metric='price', fire_once=True,
+                 debounce=0, callback=None, rule_id=None):
+        """Add an alert rule
+
+        Args:
+            address: Token address
+            threshold: Value that triggers the alert when crossed
+            direction: 'above' or 'below'
+            metric: 'price' or 'volume'
+            fire_once: Deactivate the rule after it fires
+            debounce: Seconds to suppress repeat alerts of a recurring rule
+            callback: Called with the alert dict (defaults to on_alert)
+            rule_id: Optional id, generated when not given
+
+        Returns:
+            The rule id
+        """
+        if direction not in ('above', 'below'):
+            raise ValueError("direction must be 'above' or 'below'")
+        if metric not in self.METRICS:
+            raise ValueError(f"metric must be one of {list(self.METRICS)}")
+
+        with self.lock:
+            if rule_id is None:
+                rule_id = self._next_id
+                self._next_id += 1
+            if rule_id in self._rules:
+                raise ValueError(f"Rule {rule_id} already exists")
+            rule = {
+                'id': rule_id,
+                'address': address,
+                'metric': metric,
+                'direction': direction,
+                'threshold': float(threshold),
+                'fire_once': fire_once,
+                'debounce': debounce,
+                'callback': callback,
+                'active': True,
+                'next_allowed': 0.0,
+            }
+            self._rules[rule_id] = rule
+            book = self._books.setdefault((address, metric), _AlertBook())
+            book.rules.append(rule)
+            book.dirty = True
+        return rule_id
+
+    def remove_rule(self, rule_id):
+        """Remove a rule; returns False if it does not exist"""
+        with self.lock:
+            rule = self._rules.pop(rule_id, None)
+            if rule is None:
+                return False
+            rule['active'] = False
+            self._books[(rule['address'], rule['metric'])].dirty = True
+        return True
+
+    @property
+    def addresses(self):
+        """Addresses with at least one rule"""
+        return sorted({address for address, _ in self._books})
+
+    def process(self, address, value, metric='price', timestamp=None):
+        """Evaluate one tick and fire the rules it crosses
+
+        Returns:
+            List of alert dicts fired by this tick
+        """
+        key = (address, metric)
+        previous = self._last.get(key)
+        self._last[key] = value
+        if previous is None or value == previous:
+            return []
+        book = self._books.get(key)
+        if book is None:
+            return []
+        if book.dirty:
+            with self.lock:
+                book.rebuild()
+
+        if value > previous:
+            thresholds, rules = book.above, book.above_rules
+            candidates = rules[bisect.bisect_right(thresholds, previous):bisect.bisect_right(thresholds, value)]
+        else:
+            thresholds, rules = book.below, book.below_rules
+            candidates = rules[bisect.bisect_left(thresholds, value):bisect.bisect_left(thresholds, previous)]
+        if not candidates:
+            return []
+
+        now = timestamp if timestamp is not None else time.time()
+        alerts = []
+        for rule in candidates:
+            if not rule['active'] or now < rule['next_allowed']:
+                continue
+            if rule['fire_once']:
+                rule['active'] = False
+                self._rules.pop(rule['id'], None)
+                book.inactive += 1
+            else:
+                rule['next_allowed'] = now + rule['debounce']
+            alert = {
+                'rule_id': rule['id'],
+                'address': address,
+                'metric': metric,
+                'direction': rule['direction'],
+                'threshold': rule['threshold'],
+                'value': value,
+                'previous': previous,
+                'time': now,
+            }
+            alerts.append(alert)
+            callback = rule['callback'] or self.on_alert
+            if callback:
+                try:
+                    callback(alert)
+                except Exception as e:
+                    print(f"Alert callback failed for rule {rule['id']}: {e}")
+
+        # Compact fired rules once they make up half the book
+        if book.inactive * 2 > len(book.rules):
+            book.dirty = True
+        return alerts
+
+    def on_tick(self, message):
+        """Evaluate a PRICE_DATA WebSocket message against all metrics"""
+        data = message.get('data') or {}
+        address = data.get('address')
+        timestamp = data.get('unixTime')
+        alerts = []
+        for metric, field in self.METRICS.items():
+            value = data.get(field)
+            if value is not None:
+                alerts.extend(self.process(address, float(value), metric, timestamp))
+        return alerts
+
+    def attach(self, ws, chart_type="1m"):
+        """Feed PRICE_DATA from a connected BirdeyeDataServicesWebSocket into the engine
+
+        Subscribes to every address with rules; an existing PRICE_DATA
+        callback keeps receiving messages.
+        """
+        existing = ws.callbacks.get('PRICE_DATA')
+
+        def callback(message):
+            self.on_tick(message)
+            if existing:
+                existing(message)
+
+        ws.subscribe_prices(self.addresses, callback, chart_type=chart_type)
+
+
+class SharedRingBuffer:
+    """Single-producer ring buffer of price records in shared memory
+
+    The producer process writes fixed-size records and bumps a head counter;
+    the consumer keeps its own tail. Nothing is pickled between processes.
+    If the consumer falls more than capacity records behind, the overwritten
+    records are counted as dropped.
+    """
+
+    DTYPE = np.dtype([
+        ('address', np.int32),
+        ('unix_time', np.int64),
+        ('o', np.float64),
+        ('h', np.float64),
+        ('l', np.float64),
+        ('c', np.float64),
+        ('v', np.float64),
+        ('value', np.float64),
+    ])
+    HEADER_SIZE = 64
+
+    def __init__(self, capacity=65536, name=None):
+        """Create a new buffer, or attach to an existing one by name"""
+        from multiprocessing import shared_memory
+
+        self.capacity = capacity
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=self.HEADER_SIZE + capacity * self.DTYPE.itemsize)
+            self.owner = True
+        else:
+            try:
+                # The creating process owns cleanup; attaching processes must not unlink it
+                self.shm = shared_memory.SharedMemory(name=name, track=False)
+            except TypeError:
+                self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.name = self.shm.name
+        self._head = np.ndarray((1,), dtype=np.int64, buffer=self.shm.buf)
+        self.records = np.ndarray((capacity,), dtype=self.DTYPE, buffer=self.shm.buf, offset=self.HEADER_SIZE)
+        if self.owner:
+            self._head[0] = 0
+
+    @property
+    def head(self):
+        return int(self._head[0])
+
+    def write(self, record):
+        """Append one record tuple in DTYPE field order"""
+        head = int(self._head[0])
+        self.records[head % self.capacity] = record
+        self._head[0] = head + 1
+
+    def read(self, tail):
+        """Records written since tail
+
+        Returns:
+            Tuple (records, new tail, number of records dropped)
+        """
+        head = self.head
+        dropped = max(0, head - tail - self.capacity)
+        tail += dropped
+        if head == tail:
+            return self.records[:0].copy(), tail, dropped
+        positions = np.arange(tail, head) % self.capacity
+        records = self.records[positions]
+        # Slots the producer lapped while we were copying may be torn; if it
+        # moved at all, the slot it is writing right now may be torn too
+        moved = self.head - head
+        lapped = max(0, head + moved + (1 if moved else 0) - self.capacity - tail)
+        if lapped:
+            records = records[lapped:]
+            dropped += lapped
+        return records, head, dropped
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _price_shard_worker(ring_name, capacity, assignment, control, chart_type, handler):
+    """Worker process: one WebSocket connection feeding one ring buffer"""
+    ring = SharedRingBuffer(capacity, name=ring_name)
+    state = {'index': {}}
+
+    def on_price(message):
+        data = message.get('data') or {}
+        index = state['index'].get(data.get('address'))
+        if index is None:
+            return
+        value = np.nan
+        if handler:
+            result = handler(data)
+            if result is None:
+                return
+            if isinstance(result, (int, float)) and not isinstance(result, bool):
+                value = result
+        ring.write((index, data.get('unixTime') or 0, data.get('o', np.nan), data.get('h', np.nan),
+                    data.get('l', np.nan), data.get('c', np.nan), data.get('v', np.nan), value))
+
+    ws = BirdeyeDataServicesWebSocket()
+    ws.connect()
+
+    def subscribe(pairs):
+        state['index'] = {address: index for index, address in pairs}
+        ws.subscribe_prices([address for _, address in pairs], on_price, chart_type=chart_type)
+
+    subscribe(assignment)
+    try:
+        while ws.ws_thread.is_alive():
+            try:
+                pairs = control.get(timeout=1)
+            except queue.Empty:
+                continue
+            if pairs is None:
+                return
+            subscribe(pairs)
+        # Connection dropped: exit non-zero so the supervisor rebalances
+        sys.exit(1)
+    finally:
+        ws.close()
+        ring.shm.close()
+
+
+class ShardedPriceConsumer:
+    """Supervisor sharding price subscriptions across worker processes
+
+    Addresses are split across num_workers processes, each with its own
+    WebSocket connection, so JSON decoding and handler work scale with
+    cores. Workers write fixed-size records into per-worker shared memory
+    ring buffers that the parent drains in batches as NumPy record arrays.
+    When a worker dies, its addresses are reassigned to the survivors and
+    its slot is restarted with exponential backoff. A slot that keeps dying
+    is given up after MAX_RESTARTS restarts; once every slot is given up,
+    the consumer stops and poll() raises the error.
+
+    handler, if given, runs inside the workers on each PRICE_DATA payload:
+    returning None drops the tick, returning a number stores it in the
+    record's 'value' field. It must be a picklable top-level function.
+    """
+
+    # Seconds before the first restart of a dead worker, doubled per restart
+    RESTART_BACKOFF = 1.0
+    # Restarts per slot before it is given up
+    MAX_RESTARTS = 5
+    # A worker that ran this many seconds before dying resets its restart count
+    HEALTHY_UPTIME = 60
+
+    def __init__(self, addresses, num_workers=None, chart_type="1m", handler=None,
+                 ring_capacity=65536, start_method="spawn"):
+        import multiprocessing
+
+        self.addresses = list(dict.fromkeys(addresses))
+        self.num_workers = max(1, min(num_workers or os.cpu_count() or 1, len(self.addresses)))
+        self.chart_type = chart_type
+        self.handler = handler
+        self.ring_capacity = ring_capacity
+        self.context = multiprocessing.get_context(start_method)
+        self.workers = []
+        self.dropped = 0
+        self.error = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._poll_lock = threading.Lock()
+
+    def _start_worker(self, slot, pairs):
+        worker = self.workers[slot]
+        control = self.context.Queue()
+        process = self.context.Process(
+            target=_price_shard_worker,
+            args=(worker['ring'].name, self.ring_capacity, pairs, control, self.chart_type, self.handler),
+            daemon=True,
+        )
+        process.start()
+        worker.update(process=process, control=control, pairs=pairs, alive=True, started_at=time.monotonic())
+
+    def start(self, on_records=None, interval=0.01):
+        """Start the workers and a thread supervising them
+
+        With on_records, the thread also drains the ring buffers and hands
+        each batch to it. Without it, the thread only checks worker health
+        and records are left for the caller to poll().
+
+        Args:
+            on_records: Called with each non-empty batch from poll()
+            interval: Seconds between polls of the ring buffers
+        """
+        pairs = list(enumerate(self.addresses))
+        for slot in range(self.num_workers):
+            self.workers.append({'ring': SharedRingBuffer(self.ring_capacity), 'tail': 0,
+                                 'restarts': 0, 'restart_at': None, 'failed': False})
+            self._start_worker(slot, pairs[slot::self.num_workers])
+
+        self._stop.clear()
+        self.error = None
+
+        def run():
+            last_check = 0.0
+            while not self._stop.is_set():
+                if on_records:
+                    records = self.poll()
+                    if len(records):
+                        on_records(records)
+                if time.monotonic() - last_check > 1:
+                    try:
+                        self.check_workers()
+                    except RuntimeError as e:
+                        print(f"❌ {e}")
+                        self.error = e
+                        return
+                    last_check = time.monotonic()
+                self._stop.wait(interval if on_records else 1)
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+
+    def poll(self):
+        """Drain all ring buffers into one record array (see SharedRingBuffer.DTYPE)
+
+        Raises:
+            RuntimeError: Every worker slot was given up (see check_workers)
+        """
+        if self.error:
+            raise self.error
+        batches = []
+        with self._poll_lock:
+            for worker in self.workers:
+                records, worker['tail'], dropped = worker['ring'].read(worker['tail'])
+                self.dropped += dropped
+                if len(records):
+                    batches.append(records)
+        if not batches:
+            return np.zeros(0, dtype=SharedRingBuffer.DTYPE)
+        return np.concatenate(batches)
+
+    def check_workers(self):
+        """Reassign the addresses of dead workers and restart their slots with backoff
+
+        Raises:
+            RuntimeError: Every slot died more than MAX_RESTARTS times in a row
+        """
+        now = time.monotonic()
+        dead = [w for w in self.workers if w.get('alive') and not w['process'].is_alive()]
+        orphaned = []
+        for worker in dead:
+            process = worker['process']
+            worker['alive'] = False
+            orphaned.extend(worker['pairs'])
+            if now - worker['started_at'] >= self.HEALTHY_UPTIME:
+                worker['restarts'] = 0
+            worker['restarts'] += 1
+            if worker['restarts'] > self.MAX_RESTARTS:
+                worker['failed'] = True
+                print(f"❌ Worker {process.pid} exited ({process.exitcode}), "
+                      f"giving up after {self.MAX_RESTARTS} restarts")
+            else:
+                delay = self.RESTART_BACKOFF * 2 ** (worker['restarts'] - 1)
+                worker['restart_at'] = now + delay
+                print(f"⚠️ Worker {process.pid} exited ({process.exitcode}), "
+                      f"reassigning {len(worker['pairs'])} addresses and restarting in {delay:.0f}s")
+            worker['pairs'] = []
+
+        # Survivors cover the addresses until the slots are back
+        live = [w for w in self.workers if w['alive']]
+        if orphaned and live:
+            for pair in orphaned:
+                target = min(live, key=lambda w: len(w['pairs']))
+                target['pairs'] = target['pairs'] + [pair]
+            for target in live:
+                target['control'].put(target['pairs'])
+
+        due = [w for w in self.workers
+               if not w['alive'] and not w['failed'] and w['restart_at'] is not None and w['restart_at'] <= now]
+        if due:
+            # Rebalance every address across the live workers and the restarted slots
+            slots = [w for w in self.workers if w['alive']] + due
+            pairs = list(enumerate(self.addresses))
+            for index, worker in enumerate(slots):
+                share = pairs[index::len(slots)]
+                if worker['alive']:
+                    worker['pairs'] = share
+                    worker['control'].put(share)
+                else:
+                    worker['restart_at'] = None
+                    self._start_worker(self.workers.index(worker), share)
+
+        if self.workers and all(w['failed'] for w in self.workers):
+            raise RuntimeError(f"All {len(self.workers)} price workers failed; "
+                               f"check BDS_API_KEY and the network connection")
+
+    def to_dataframe(self, records):
+        """Record array from poll() as a DataFrame with token addresses"""
+        df = pd.DataFrame(records)
+        df['address'] = np.asarray(self.addresses, dtype=object)[df['address'].to_numpy()] if len(df) else []
+        return df
+
+    def stop(self):
+        """Stop the drain thread and workers, then release the shared memory"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        for worker in self.workers:
+            if worker.get('alive'):
+                worker['control'].put(None)
+        for worker in self.workers:
+            process = worker.get('process')
+            if process:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+            worker['ring'].close()
+        self.workers = []
+
+
+class AdaptiveWatcher:
+    """Poll wallets and tokens only as often as their values change
+
+    Watched entities sit in a priority queue ordered by next poll time.
+    After each poll the entity's interval adapts to its observed volatility:
+    it is set to the time the value is expected to take to move by
+    change_threshold, growing by at most backoff per poll for quiet entities
+    and clamped to [min_interval, max_interval]. All polls share one request
+    budget, so when the budget is tight the most overdue entities go first.
+    Callbacks only fire when the value moved by more than change_threshold.
+    """
+
+    def __init__(self, client, requests_per_minute=60, change_threshold=0.001, backoff=1.5):
+        """
+        Args:
+            client: BirdeyeDataServices instance
+            requests_per_minute: Global request budget across all entities
+            change_threshold: Relative change that counts as a change (0.001 = 0.1%)
+            backoff: Maximum growth factor of an interval per unchanged poll
+        """
+        self.client = client
+        self.change_threshold = change_threshold
+        self.backoff = backoff
+        self.budget = RateLimiter(requests_per_minute / 60.0, burst=1)
+        self.entities = {}
+        self._queue = []
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _wallet_value(data):
+        value = data.get('total_value', data.get('totalUsd'))
+        return float(value) if value is not None else None
+
+    @staticmethod
+    def _token_value(data):
+        value = data.get('price')
+        return float(value) if value is not None else None
+
+    def _watch(self, key, fetch, extract, callback, min_interval, max_interval):
+        with self._lock:
+            self.entities[key] = {
+                'fetch': fetch,
+                'extract': extract,
+                'callback': callback,
+                'interval': float(min_interval),
+                'min_interval': float(min_interval),
+                'max_interval': float(max_interval),
+                'value': None,
+                'last_polled': None,
+                'last_poll': None,
+                'volatility': 0.0,
+                'polls': 0,
+                'changes': 0,
+            }
+            self._schedule(key, time.time())
+        self._wakeup.set()
+        return key
+
+    def watch_wallet(self, wallet_address, callback=None, min_interval=30, max_interval=1800):
+        """Watch a wallet's net worth
+
+        Args:
+            wallet_address: Solana wallet address
+            callback: Called as callback(key, value, previous, data) when the
+                net worth changes
+            min_interval, max_interval: Bounds for the poll interval in seconds
+
+        Returns:
+            The entity key, for unwatch()
+        """
+        return self._watch(('wallet', wallet_address), self.client.get_wallet_net_worth,
+                           self._wallet_value, callback, min_interval, max_interval)
+
+    def watch_token(self, address, callback=None, min_interval=10, max_interval=600):
+        """Watch a token's market data price; see watch_wallet for arguments"""
+        return self._watch(('token', address), self.client.get_token_market_data,
+                           self._token_value, callback, min_interval, max_interval)
+
+    def unwatch(self, key):
+        """Stop watching an entity"""
+        with self._lock:
+            return self.entities.pop(key, None) is not None
+
+    def _schedule(self, key, due):
+        self._sequence += 1
+        self.entities[key]['due'] = due
+        heapq.heappush(self._queue, (due, self._sequence, key))
+
+    def _next_due(self):
+        """Earliest (due, key) still watched, dropping stale queue entries"""
+        while self._queue:
+            due, _, key = self._queue[0]
+            entity = self.entities.get(key)
+            if entity is not None and entity['due'] == due:
+                return due, key
+            heapq.heappop(self._queue)
+        return None, None
+
+    @staticmethod
+    def _relative_change(value, reference):
+        return abs(value - reference) / abs(reference) if reference else float(value != reference)
+
+    def _poll(self, key):
+        entity = self.entities.get(key)
+        if entity is None:
+            return
+        self.budget.acquire()
+        response = entity['fetch'](key[1])
+        now = time.time()
+        data = response.get('data') if response else None
+        value = entity['extract'](data) if isinstance(data, dict) else None
+
+        with self._lock:
+            if key not in self.entities:
+                return
+            entity['polls'] += 1
+            previous = entity['value']
+            changed = False
+            if value is not None:
+                if previous is not None and entity['last_poll'] is not None:
+                    changed = self._relative_change(value, previous) > self.change_threshold
+                    # Smoothed relative change per second since the last poll; value
+                    # only moves on reported changes, so slow drift would span several polls
+                    moved = self._relative_change(value, entity['last_polled'])
+                    rate = moved / max(now - entity['last_poll'], 1e-9)
+                    entity['volatility'] = 0.7 * entity['volatility'] + 0.3 * rate
+                    target = self.change_threshold / entity['volatility'] if entity['volatility'] else float('inf')
+                    interval = min(target, entity['interval'] * self.backoff)
+                    entity['interval'] = min(max(interval, entity['min_interval']), entity['max_interval'])
+                if previous is None or changed:
+                    entity['value'] = value
+                entity['changes'] += changed
+                entity['last_polled'] = value
+                entity['last_poll'] = now
+            else:
+                # Failed poll: back off without touching the volatility estimate
+                entity['interval'] = min(entity['interval'] * self.backoff, entity['max_interval'])
+            self._schedule(key, now + entity['interval'])
+
+        if changed and entity['callback']:
+            try:
+                entity['callback'](key, value, previous, data)
+            except Exception as e:
+                print(f"Watcher callback failed for {key}: {e}")
+
+    def _poll_next(self):
+        """Poll the most overdue entity; returns its next due time if none is due"""
+        with self._lock:
+            due, key = self._next_due()
+        if key is None or due > time.time():
+            return due
+        self._poll(key)
+        return 0.0
+
+    def step(self):
+        """Poll every entity that is due now; returns the number polled"""
+        polled = 0
+        while self._poll_next() == 0.0:
+            polled += 1
+        return polled
+
+    def start(self):
+        """Poll due entities on a background thread"""
+        self._stop.clear()
+
+        def run():
+            while not self._stop.is_set():
+                self._wakeup.clear()
+                due = self._poll_next()
+                if due != 0.0:
+                    self._wakeup.wait(max(0.0, due - time.time()) if due is not None else None)
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        """Poll interval, counts and last value per watched entity"""
+        with self._lock:
+            rows = [{
+                'kind': key[0],
+                'address': key[1],
+                'value': entity['value'],
+                'interval': entity['interval'],
+                'polls': entity['polls'],
+                'changes': entity['changes'],
+                'next_poll_in': entity['due'] - time.time(),
+            } for key, entity in self.entities.items()]
+        return pd.DataFrame(rows)
+
+
 def check_api_key(api_key_type='standard'):
     """Check if API key is properly configured"""
+    cache = ResponseCache.from_env()
+    if cache and cache.mode == 'replay':
+        print(f"✅ Using recorded API responses from {cache.path}")
+        return True
+
     if api_key_type == 'standard':
         api_key = os.getenv('BDS_STANDARD_API_KEY')
         key_name = 'BDS_STANDARD_API_KEY'